@@ -13,6 +13,13 @@ from typing import Any, Optional
 _config_cache: dict[str, Any] = {}
 _config_initialized = False
 
+# AUTO_BAN_ERROR_CODES 环境变量的解析缓存：(原始字符串, 解析结果)
+_auto_ban_env_cache: Optional[tuple[str, list[int]]] = None
+
+# 解析后的 API 密码缓存（每个请求鉴权都会读取）：(解析时的配置快照, 密码)
+# 只有快照仍是当前 _config_cache 时才命中，reload_config() 替换配置后旧值自动失效
+_api_password_cache: Optional[tuple[dict[str, Any], str]] = None
+
 # Client Configuration
 
 # 需要自动封禁的错误码 (默认值，可通过环境变量或配置覆盖)
@@ -71,7 +78,7 @@ async def init_config():
 
 async def reload_config():
     """重新加载配置（修改配置后调用）"""
-    global _config_cache, _config_initialized
+    global _config_cache, _config_initialized, _api_password_cache
 
     try:
         from src.storage_adapter import get_storage_adapter
@@ -86,6 +93,9 @@ async def reload_config():
         _config_initialized = True
     except Exception:
         pass
+    finally:
+        # 在配置替换之后再清空：重新加载期间的 await 中到达的请求可能已按旧配置写回缓存
+        _api_password_cache = None
 
 
 def _get_cached_config(key: str, default: Any = None) -> Any:
@@ -100,8 +110,10 @@ async def get_config_value(key: str, default: Any = None, env_var: Optional[str]
         await init_config()
 
     # Priority 1: Environment variable
-    if env_var and os.getenv(env_var):
-        return os.getenv(env_var)
+    if env_var:
+        env_value = os.getenv(env_var)
+        if env_value:
+            return env_value
 
     # Priority 2: Memory cache
     value = _get_cached_config(key)
@@ -135,12 +147,20 @@ async def get_auto_ban_error_codes() -> list:
     Database config key: auto_ban_error_codes
     Default: [400, 403]
     """
+    global _auto_ban_env_cache
+
     env_value = os.getenv("AUTO_BAN_ERROR_CODES")
     if env_value:
+        # 每个请求都会调用，按原始字符串缓存解析结果，避免重复 split/int 解析
+        if _auto_ban_env_cache is not None and _auto_ban_env_cache[0] == env_value:
+            return _auto_ban_env_cache[1]
         try:
-            return [int(code.strip()) for code in env_value.split(",") if code.strip()]
+            codes = [int(code.strip()) for code in env_value.split(",") if code.strip()]
         except ValueError:
             pass
+        else:
+            _auto_ban_env_cache = (env_value, codes)
+            return codes
 
     codes = await get_config_value("auto_ban_error_codes")
     if codes and isinstance(codes, list):
@@ -237,13 +257,25 @@ async def get_api_password() -> str:
     Database config key: api_password
     Default: Uses PASSWORD env var for compatibility, otherwise 'pwd'
     """
+    global _api_password_cache
+
+    # 配置只在 reload_config() 时变化，解析结果与所依据的配置快照绑定，快照被替换后不再命中
+    cached = _api_password_cache
+    if cached is not None and cached[0] is _config_cache:
+        return cached[1]
+
+    # 先记下快照：解析期间若配置被重新加载，写入的缓存会因快照不匹配而失效
+    config_snapshot = _config_cache
+
     # 优先使用 API_PASSWORD，如果没有则使用通用 PASSWORD 保证兼容性
     api_password = await get_config_value("api_password", None, "API_PASSWORD")
-    if api_password is not None:
-        return str(api_password)
+    if api_password is None:
+        # 兼容性：使用通用密码
+        api_password = await get_config_value("password", "pwd", "PASSWORD")
 
-    # 兼容性：使用通用密码
-    return str(await get_config_value("password", "pwd", "PASSWORD"))
+    api_password = str(api_password)
+    _api_password_cache = (config_snapshot, api_password)
+    return api_password
 
 
 async def get_panel_password() -> str:
@@ -283,6 +283,13 @@ class Logger:
     def critical(self, message: str):
         _log("critical", message)
 
+    def is_enabled(self, level: str) -> bool:
+        """判断指定级别是否会被输出，用于在构造高开销日志内容前短路"""
+        if not _log_enabled:
+            return False
+        level_val = LOG_LEVELS.get(level.lower())
+        return level_val is not None and level_val >= _cached_log_level
+
     def get_current_level(self) -> str:
         current_level = _get_current_log_level()
         for name, value in LOG_LEVELS.items():
@@ -5,30 +5,30 @@ Antigravity API Client - Handles communication with Google's Antigravity API
 
 import asyncio
 import json
-import uuid
-from datetime import datetime, timezone
+import time
+from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional
 
 from fastapi import Response
 from config import (
     get_antigravity_api_url,
     get_antigravity_stream2nostream,
-    get_auto_ban_error_codes,
 )
 from log import log
 
 from src.credential_manager import credential_manager
 from src.httpx_client import stream_post_async, post_async
-from src.models import Model, model_to_dict
-from src.utils import ANTIGRAVITY_USER_AGENT
+from src.utils import ANTIGRAVITY_USER_AGENT, sequential_id
 
 # 导入共同的基础功能
 from src.api.utils import (
+    get_retry_delay,
     handle_error_with_retry,
     get_retry_config,
     record_api_call_success,
     record_api_call_error,
     parse_and_log_cooldown,
+    parse_retry_after,
     collect_streaming_response,
 )
 
@@ -39,6 +39,14 @@ from src.api.utils import (
 
 # ==================== 辅助函数 ====================
 
+# 每个请求都相同的请求头，模块加载时构建一次
+_BASE_HEADERS: Dict[str, str] = {
+    'User-Agent': ANTIGRAVITY_USER_AGENT,
+    'Content-Type': 'application/json',
+    'Accept-Encoding': 'gzip',
+}
+
+
 def build_antigravity_headers(access_token: str, model_name: str = "") -> Dict[str, str]:
     """
     构建 Antigravity API 请求头
@@ -51,22 +59,14 @@ def build_antigravity_headers(access_token: str, model_name: str = "") -> Dict[s
         请求头字典
     """
     headers = {
-        'User-Agent': ANTIGRAVITY_USER_AGENT,
+        **_BASE_HEADERS,
         'Authorization': f'Bearer {access_token}',
-        'Content-Type': 'application/json',
-        'Accept-Encoding': 'gzip',
-        'requestId': f"req-{uuid.uuid4()}"
+        'requestId': f"req-{sequential_id()}"
     }
 
-    # 根据模型名称判断 request_type
+    # 根据模型名称判断 request_type（先判断是否是图片模型）
     if model_name:
-        # 先判断是否是图片模型
-        if "image" in model_name.lower():
-            request_type = "image_gen"
-            headers['requestType'] = request_type
-        else:
-            request_type = "agent"
-            headers['requestType'] = request_type
+        headers['requestType'] = "image_gen" if "image" in model_name.lower() else "agent"
 
     return headers
 
@@ -91,10 +91,15 @@ async def stream_request(
     """
     model_name = body.get("model", "")
 
-    # 1. 获取有效凭证
-    cred_result = await credential_manager.get_valid_credential(
-        mode="antigravity", model_name=model_name
+    # 1. 获取有效凭证，同时并行读取URL和重试配置（凭证I/O与配置读取重叠）
+    cred_result, antigravity_url, retry_config = await asyncio.gather(
+        credential_manager.get_valid_credential(
+            mode="antigravity", model_name=model_name
+        ),
+        get_antigravity_api_url(),
+        get_retry_config(),
     )
+    DISABLE_ERROR_CODES = retry_config["auto_ban_error_codes"]  # 禁用凭证的错误码
 
     if not cred_result:
         # 如果返回值是None，直接返回错误500
@@ -120,7 +125,6 @@ async def stream_request(
         return
 
     # 2. 构建URL和请求头
-    antigravity_url = await get_antigravity_api_url()
     target_url = f"{antigravity_url}/v1internal:streamGenerateContent?alt=sse"
 
     auth_headers = build_antigravity_headers(access_token, model_name)
@@ -137,13 +141,12 @@ async def stream_request(
     }
 
     # 3. 调用stream_post_async进行请求
-    retry_config = await get_retry_config()
     max_retries = retry_config["max_retries"]
     retry_interval = retry_config["retry_interval"]
 
-    DISABLE_ERROR_CODES = await get_auto_ban_error_codes()  # 禁用凭证的错误码
     last_error_response = None  # 记录最后一次的错误响应
     next_cred_task = None  # 预热的下一个凭证任务
+    debug_enabled = log.is_enabled("debug")  # 每个流只判断一次，避免逐 chunk 格式化日志
 
     # 内部函数：快速更新凭证(只更新token和project_id,避免重建整个请求)
     async def refresh_credential_fast():
@@ -166,6 +169,7 @@ async def stream_request(
     for attempt in range(max_retries + 1):
         success_recorded = False  # 标记是否已记录成功
         need_retry = False  # 标记是否需要重试
+        retry_delay = retry_interval  # 本次重试前的等待时间，收到 Retry-After 时缩短
 
         try:
             async for chunk in stream_post_async(
@@ -214,10 +218,14 @@ async def stream_request(
                         )
 
                         # 检查是否应该重试
+                        retry_delay = get_retry_delay(
+                            retry_interval, parse_retry_after(chunk.headers.get("retry-after"))
+                        )
                         should_retry = await handle_error_with_retry(
                             credential_manager, status_code, current_file,
-                            retry_config["retry_enabled"], attempt, max_retries, retry_interval,
-                            mode="antigravity"
+                            retry_config["retry_enabled"], attempt, max_retries,
+                            mode="antigravity",
+                            retry_config=retry_config
                         )
 
                         if should_retry and attempt < max_retries:
@@ -248,11 +256,12 @@ async def stream_request(
                         success_recorded = True
                         log.debug(f"[ANTIGRAVITY STREAM] 开始接收流式响应，模型: {model_name}")
 
-                    # 记录原始chunk内容（用于调试）
-                    if isinstance(chunk, bytes):
-                        log.debug(f"[ANTIGRAVITY STREAM RAW] chunk(bytes): {chunk}")
-                    else:
-                        log.debug(f"[ANTIGRAVITY STREAM RAW] chunk(str): {chunk}")
+                    # 记录原始chunk内容（用于调试，未开启 debug 时跳过字符串格式化）
+                    if debug_enabled:
+                        if isinstance(chunk, bytes):
+                            log.debug(f"[ANTIGRAVITY STREAM RAW] chunk(bytes): {chunk}")
+                        else:
+                            log.debug(f"[ANTIGRAVITY STREAM RAW] chunk(str): {chunk}")
 
                     yield chunk
 
@@ -297,14 +306,14 @@ async def stream_request(
                             if access_token and project_id:
                                 auth_headers["Authorization"] = f"Bearer {access_token}"
                                 final_payload["project"] = project_id
-                                await asyncio.sleep(retry_interval)
+                                await asyncio.sleep(retry_delay)
                                 continue  # 重试
                     except Exception as e:
                         log.warning(f"[ANTIGRAVITY STREAM] 预热凭证任务失败: {e}")
                         next_cred_task = None
 
                 # 如果预热的凭证不可用,则同步获取
-                await asyncio.sleep(retry_interval)
+                await asyncio.sleep(retry_delay)
 
                 if not await refresh_credential_fast():
                     log.error("[ANTIGRAVITY STREAM] 重试时无可用凭证或令牌")
@@ -379,10 +388,15 @@ async def non_stream_request(
 
     model_name = body.get("model", "")
 
-    # 1. 获取有效凭证
-    cred_result = await credential_manager.get_valid_credential(
-        mode="antigravity", model_name=model_name
+    # 1. 获取有效凭证，同时并行读取URL和重试配置（凭证I/O与配置读取重叠）
+    cred_result, antigravity_url, retry_config = await asyncio.gather(
+        credential_manager.get_valid_credential(
+            mode="antigravity", model_name=model_name
+        ),
+        get_antigravity_api_url(),
+        get_retry_config(),
     )
+    DISABLE_ERROR_CODES = retry_config["auto_ban_error_codes"]  # 禁用凭证的错误码
 
     if not cred_result:
         # 如果返回值是None，直接返回错误500
@@ -406,7 +420,6 @@ async def non_stream_request(
         )
 
     # 2. 构建URL和请求头
-    antigravity_url = await get_antigravity_api_url()
     target_url = f"{antigravity_url}/v1internal:generateContent"
 
     auth_headers = build_antigravity_headers(access_token, model_name)
@@ -423,11 +436,9 @@ async def non_stream_request(
     }
 
     # 3. 调用post_async进行请求
-    retry_config = await get_retry_config()
     max_retries = retry_config["max_retries"]
     retry_interval = retry_config["retry_interval"]
 
-    DISABLE_ERROR_CODES = await get_auto_ban_error_codes()  # 禁用凭证的错误码
     last_error_response = None  # 记录最后一次的错误响应
     next_cred_task = None  # 预热的下一个凭证任务
 
@@ -451,6 +462,7 @@ async def non_stream_request(
 
     for attempt in range(max_retries + 1):
         need_retry = False  # 标记是否需要重试
+        retry_delay = retry_interval  # 本次重试前的等待时间，收到 Retry-After 时缩短
         
         try:
             response = await post_async(
@@ -516,7 +528,7 @@ async def non_stream_request(
 
                     # 解析冷却时间
                     cooldown_until = None
-                    if status_code == 429 or status_code == 503 and error_text:
+                    if (status_code == 429 or status_code == 503) and error_text:
                         try:
                             cooldown_until = await parse_and_log_cooldown(error_text, mode="antigravity")
                         except Exception:
@@ -538,10 +550,14 @@ async def non_stream_request(
                     )
 
                     # 检查是否应该重试
+                    retry_delay = get_retry_delay(
+                        retry_interval, parse_retry_after(response.headers.get("retry-after"))
+                    )
                     should_retry = await handle_error_with_retry(
                         credential_manager, status_code, current_file,
-                        retry_config["retry_enabled"], attempt, max_retries, retry_interval,
-                        mode="antigravity"
+                        retry_config["retry_enabled"], attempt, max_retries,
+                        mode="antigravity",
+                        retry_config=retry_config
                     )
 
                     if should_retry and attempt < max_retries:
@@ -577,14 +593,14 @@ async def non_stream_request(
                             if access_token and project_id:
                                 auth_headers["Authorization"] = f"Bearer {access_token}"
                                 final_payload["project"] = project_id
-                                await asyncio.sleep(retry_interval)
+                                await asyncio.sleep(retry_delay)
                                 continue  # 重试
                     except Exception as e:
                         log.warning(f"[ANTIGRAVITY] 预热凭证任务失败: {e}")
                         next_cred_task = None
 
                 # 如果预热的凭证不可用,则同步获取
-                await asyncio.sleep(retry_interval)
+                await asyncio.sleep(retry_delay)
 
                 if not await refresh_credential_fast():
                     log.error("[ANTIGRAVITY] 重试时无可用凭证或令牌")
@@ -627,9 +643,24 @@ async def non_stream_request(
 
 # ==================== 模型和配额查询 ====================
 
+# 模型列表很少变化，客户端/面板却会频繁轮询，成功结果在进程内缓存一段时间
+_MODELS_CACHE_TTL = 300.0
+_models_cache: Optional[tuple] = None  # (过期时间, 模型列表)
+_models_cache_lock = asyncio.Lock()
+
+# 额度信息按访问令牌短时间缓存，避免面板重复刷新时每次都请求上游
+_QUOTA_CACHE_TTL = 30.0
+_quota_cache: Dict[str, tuple] = {}  # access_token -> (过期时间, 额度信息)
+
+# 额度重置时间统一显示为北京时间 (UTC+8)
+_BEIJING_TZ = timezone(timedelta(hours=8))
+
+
 async def fetch_available_models() -> List[Dict[str, Any]]:
     """
     获取可用模型列表，返回符合 OpenAI API 规范的格式
+
+    成功结果缓存 _MODELS_CACHE_TTL 秒；并发的未命中请求共用一次上游调用
     
     Returns:
         模型列表，格式为字典列表（用于兼容现有代码）
@@ -637,6 +668,26 @@ async def fetch_available_models() -> List[Dict[str, Any]]:
     Raises:
         返回空列表如果获取失败
     """
+    global _models_cache
+
+    cached = _models_cache
+    if cached is not None and cached[0] > time.monotonic():
+        return list(cached[1])
+
+    async with _models_cache_lock:
+        # 等锁期间可能已被其他请求填充
+        cached = _models_cache
+        if cached is not None and cached[0] > time.monotonic():
+            return list(cached[1])
+
+        model_list = await _fetch_available_models_uncached()
+        if model_list:
+            _models_cache = (time.monotonic() + _MODELS_CACHE_TTL, model_list)
+        return list(model_list)
+
+
+async def _fetch_available_models_uncached() -> List[Dict[str, Any]]:
+    """向上游请求可用模型列表（不经过缓存），失败时返回空列表"""
     # 获取凭证管理器和可用凭证
     cred_result = await credential_manager.get_valid_credential(mode="antigravity")
     if not cred_result:
@@ -665,40 +716,31 @@ async def fetch_available_models() -> List[Dict[str, Any]]:
 
         if response.status_code == 200:
             data = response.json()
-            log.debug(f"[ANTIGRAVITY] Raw models response: {json.dumps(data, ensure_ascii=False)[:500]}")
+            log.debug(f"[ANTIGRAVITY] Raw models response: {response.content[:500].decode('utf-8', errors='ignore')}")
 
-            # 转换为 OpenAI 格式的模型列表，使用 Model 类
-            model_list = []
+            # 转换为 OpenAI 格式的模型列表（直接构造与 Model 序列化结果相同的字典）
             current_timestamp = int(datetime.now(timezone.utc).timestamp())
+            model_ids = []
 
             if 'models' in data and isinstance(data['models'], dict):
                 # 遍历模型字典
-                for model_id in data['models'].keys():
-                    model = Model(
-                        id=model_id,
-                        object='model',
-                        created=current_timestamp,
-                        owned_by='google'
-                    )
-                    model_list.append(model_to_dict(model))
+                model_ids.extend(data['models'].keys())
             # 添加额外的 claude-sonnet-4-6-thinking 模型
             if "claude-sonnet-4-6" in data.get('models', {}):
-                model = Model(
-                    id='claude-sonnet-4-6-thinking',
-                    object='model',
-                    created=current_timestamp,
-                    owned_by='google'
-                )
-                model_list.append(model_to_dict(model))
+                model_ids.append('claude-sonnet-4-6-thinking')
             # 添加额外的 claude-opus-4-6 模型
             if "claude-opus-4-6-thinking" in data.get('models', {}):
-                claude_opus_model = Model(
-                    id='claude-opus-4-6',
-                    object='model',
-                    created=current_timestamp,
-                    owned_by='google'
-                )
-                model_list.append(model_to_dict(claude_opus_model))
+                model_ids.append('claude-opus-4-6')
+
+            model_list = [
+                {
+                    "id": model_id,
+                    "object": "model",
+                    "created": current_timestamp,
+                    "owned_by": "google",
+                }
+                for model_id in model_ids
+            ]
 
             log.info(f"[ANTIGRAVITY] Fetched {len(model_list)} available models")
             return model_list
@@ -733,8 +775,30 @@ async def fetch_quota_info(access_token: str) -> Dict[str, Any]:
             },
             "error": "错误信息" (仅在失败时)
         }
+
+        成功结果按令牌缓存 _QUOTA_CACHE_TTL 秒；返回值为副本，调用方修改不会影响缓存
     """
+    now = time.monotonic()
+    cached = _quota_cache.get(access_token)
+    if cached is not None and cached[0] > now:
+        return _copy_quota_info(cached[1])
+
+    result = await _fetch_quota_info_uncached(access_token)
+    if result.get("success"):
+        # 顺带清理已过期的条目（令牌会定期轮换，旧令牌不会再被查询）
+        for token in [t for t, (expires, _) in _quota_cache.items() if expires <= now]:
+            del _quota_cache[token]
+        _quota_cache[access_token] = (time.monotonic() + _QUOTA_CACHE_TTL, _copy_quota_info(result))
+    return result
+
+
+def _copy_quota_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    """复制额度信息（顶层与每个模型的条目均为新字典，条目内只有不可变的标量值）"""
+    return {**info, "models": {model_id: dict(entry) for model_id, entry in info["models"].items()}}
+
 
+async def _fetch_quota_info_uncached(access_token: str) -> Dict[str, Any]:
+    """向上游请求额度信息（不经过缓存）"""
     headers = build_antigravity_headers(access_token)
 
     try:
@@ -749,7 +813,7 @@ async def fetch_quota_info(access_token: str) -> Dict[str, Any]:
 
         if response.status_code == 200:
             data = response.json()
-            log.debug(f"[ANTIGRAVITY QUOTA] Raw response: {json.dumps(data, ensure_ascii=False)[:500]}")
+            log.debug(f"[ANTIGRAVITY QUOTA] Raw response: {response.content[:500].decode('utf-8', errors='ignore')}")
 
             quota_info = {}
 
@@ -764,11 +828,12 @@ async def fetch_quota_info(access_token: str) -> Dict[str, Any]:
                         reset_time_beijing = 'N/A'
                         if reset_time_raw:
                             try:
-                                utc_date = datetime.fromisoformat(reset_time_raw.replace('Z', '+00:00'))
-                                # 转换为北京时间 (UTC+8)
-                                from datetime import timedelta
-                                beijing_date = utc_date + timedelta(hours=8)
-                                reset_time_beijing = beijing_date.strftime('%m-%d %H:%M')
+                                # Python 3.11+ 的 fromisoformat 可直接解析 'Z' 后缀
+                                reset_at = datetime.fromisoformat(reset_time_raw)
+                                # 未带时区的时间按 UTC 处理，避免 astimezone 误用服务器本地时区
+                                if reset_at.tzinfo is None:
+                                    reset_at = reset_at.replace(tzinfo=timezone.utc)
+                                reset_time_beijing = reset_at.astimezone(_BEIJING_TZ).strftime('%m-%d %H:%M')
                             except Exception as e:
                                 log.warning(f"[ANTIGRAVITY QUOTA] Failed to parse reset time: {e}")
 
@@ -18,7 +18,7 @@ import json
 from typing import Any, Dict, Optional
 
 from fastapi import Response
-from config import get_code_assist_endpoint, get_auto_ban_error_codes
+from config import get_code_assist_endpoint
 from log import log
 
 from src.credential_manager import credential_manager
@@ -26,11 +26,13 @@ from src.httpx_client import stream_post_async, post_async
 
 # 导入共同的基础功能
 from src.api.utils import (
+    get_retry_delay,
     handle_error_with_retry,
     get_retry_config,
     record_api_call_success,
     record_api_call_error,
     parse_and_log_cooldown,
+    parse_retry_after,
 )
 from src.utils import GEMINICLI_USER_AGENT
 
@@ -144,7 +146,7 @@ async def stream_request(
     max_retries = retry_config["max_retries"]
     retry_interval = retry_config["retry_interval"]
 
-    DISABLE_ERROR_CODES = await get_auto_ban_error_codes()  # 禁用凭证的错误码
+    DISABLE_ERROR_CODES = retry_config["auto_ban_error_codes"]  # 禁用凭证的错误码
     last_error_response = None  # 记录最后一次的错误响应
     next_cred_task = None  # 预热的下一个凭证任务
 
@@ -174,6 +176,7 @@ async def stream_request(
     for attempt in range(max_retries + 1):
         success_recorded = False  # 标记是否已记录成功
         need_retry = False  # 标记是否需要重试
+        retry_delay = retry_interval  # 本次重试前的等待时间，收到 Retry-After 时缩短
 
         try:
             async for chunk in stream_post_async(
@@ -222,10 +225,14 @@ async def stream_request(
                         )
 
                         # 检查是否应该重试
+                        retry_delay = get_retry_delay(
+                            retry_interval, parse_retry_after(chunk.headers.get("retry-after"))
+                        )
                         should_retry = await handle_error_with_retry(
                             credential_manager, status_code, current_file,
-                            retry_config["retry_enabled"], attempt, max_retries, retry_interval,
-                            mode="geminicli"
+                            retry_config["retry_enabled"], attempt, max_retries,
+                            mode="geminicli",
+                            retry_config=retry_config
                         )
 
                         if should_retry and attempt < max_retries:
@@ -317,14 +324,14 @@ async def stream_request(
                             if token and project_id:
                                 auth_headers["Authorization"] = f"Bearer {token}"
                                 final_payload["project"] = project_id
-                                await asyncio.sleep(retry_interval)
+                                await asyncio.sleep(retry_delay)
                                 continue  # 重试
                     except Exception as e:
                         log.warning(f"[GEMINICLI STREAM] 预热凭证任务失败: {e}")
                         next_cred_task = None
 
                 # 如果预热的凭证不可用,则同步获取
-                await asyncio.sleep(retry_interval)
+                await asyncio.sleep(retry_delay)
 
                 if not await refresh_credential_fast():
                     log.error("[GEMINICLI STREAM] 重试时无可用凭证或刷新失败")
@@ -425,7 +432,7 @@ async def non_stream_request(
     max_retries = retry_config["max_retries"]
     retry_interval = retry_config["retry_interval"]
 
-    DISABLE_ERROR_CODES = await get_auto_ban_error_codes()  # 禁用凭证的错误码
+    DISABLE_ERROR_CODES = retry_config["auto_ban_error_codes"]  # 禁用凭证的错误码
     last_error_response = None  # 记录最后一次的错误响应
     next_cred_task = None  # 预热的下一个凭证任务
 
@@ -527,10 +534,14 @@ async def non_stream_request(
                 )
 
                 # 检查是否应该重试（会自动处理禁用逻辑）
+                retry_delay = get_retry_delay(
+                    retry_interval, parse_retry_after(response.headers.get("retry-after"))
+                )
                 should_retry = await handle_error_with_retry(
                     credential_manager, status_code, current_file,
-                    retry_config["retry_enabled"], attempt, max_retries, retry_interval,
-                    mode="geminicli"
+                    retry_config["retry_enabled"], attempt, max_retries,
+                    mode="geminicli",
+                    retry_config=retry_config
                 )
 
                 if should_retry and attempt < max_retries:
@@ -551,14 +562,14 @@ async def non_stream_request(
                                 if token and project_id:
                                     auth_headers["Authorization"] = f"Bearer {token}"
                                     final_payload["project"] = project_id
-                                    await asyncio.sleep(retry_interval)
+                                    await asyncio.sleep(retry_delay)
                                     continue  # 重试
                         except Exception as e:
                             log.warning(f"[NON-STREAM] 预热凭证任务失败: {e}")
                             next_cred_task = None
 
                     # 如果预热的凭证不可用,则同步获取
-                    await asyncio.sleep(retry_interval)
+                    await asyncio.sleep(retry_delay)
 
                     if not await refresh_credential_fast():
                         log.error("[NON-STREAM] 重试时无可用凭证或刷新失败")
@@ -3,9 +3,9 @@ Base API Client - 共用的 API 客户端基础功能
 提供错误处理、自动封禁、重试逻辑等共同功能
 """
 
-import asyncio
 import json
 from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from typing import Any, Dict, Optional
 
 from fastapi import Response
@@ -19,20 +19,27 @@ from config import (
 )
 from log import log
 from src.credential_manager import CredentialManager
+from src.utils import json_dumps_bytes, json_loads
 
 
 # ==================== 错误检查与处理 ====================
 
-async def check_should_auto_ban(status_code: int) -> bool:
+async def check_should_auto_ban(status_code: int, retry_config: Optional[Dict[str, Any]] = None) -> bool:
     """
     检查是否应该触发自动封禁
     
     Args:
         status_code: HTTP状态码
+        retry_config: get_retry_config() 的快照；提供时直接使用其中的自动封禁配置，不再重新读取
         
     Returns:
         bool: 是否应该触发自动封禁
     """
+    if retry_config is not None:
+        return (
+            retry_config["auto_ban_enabled"]
+            and status_code in retry_config["auto_ban_error_codes"]
+        )
     return (
         await get_auto_ban_enabled()
         and status_code in await get_auto_ban_error_codes()
@@ -63,6 +70,44 @@ async def handle_auto_ban(
         )
 
 
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 Retry-After 响应头
+
+    Args:
+        value: 响应头的值，可以是秒数或 HTTP 日期
+
+    Returns:
+        需要等待的秒数（不小于0），无法解析或未提供时返回 None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def get_retry_delay(retry_interval: float, retry_after: Optional[float] = None) -> float:
+    """
+    计算重试前的等待时间
+
+    重试会切换到下一个凭证，服务端给出的 Retry-After 针对的是当前凭证（其冷却已通过
+    record_api_call_error 记录），因此只在提示更短时缩短等待，不会超过配置的重试间隔
+    """
+    if retry_after is None:
+        return retry_interval
+    return min(retry_after, retry_interval)
+
+
 async def handle_error_with_retry(
     credential_manager: CredentialManager,
     status_code: int,
@@ -70,8 +115,8 @@ async def handle_error_with_retry(
     retry_enabled: bool,
     attempt: int,
     max_retries: int,
-    retry_interval: float,
-    mode: str = "geminicli"
+    mode: str = "geminicli",
+    retry_config: Optional[Dict[str, Any]] = None
 ) -> bool:
     """
     统一处理错误和重试逻辑
@@ -88,14 +133,16 @@ async def handle_error_with_retry(
         retry_enabled: 是否启用重试
         attempt: 当前重试次数
         max_retries: 最大重试次数
-        retry_interval: 重试间隔
         mode: 模式（geminicli 或 antigravity）
+        retry_config: get_retry_config() 的快照（可选），用于复用自动封禁配置
         
     Returns:
         bool: True表示需要继续重试，False表示不需要重试
+
+    只负责判断是否重试，重试前的等待由调用方按 get_retry_delay 的结果统一执行
     """
     # 优先检查自动封禁
-    should_auto_ban = await check_should_auto_ban(status_code)
+    should_auto_ban = await check_should_auto_ban(status_code, retry_config)
 
     if should_auto_ban:
         # 触发自动封禁
@@ -107,7 +154,6 @@ async def handle_error_with_retry(
                 f"[{mode.upper()} RETRY] Retrying with next credential after auto-ban "
                 f"(status {status_code}, attempt {attempt + 1}/{max_retries})"
             )
-            await asyncio.sleep(retry_interval)
             return True
         return False
 
@@ -117,7 +163,6 @@ async def handle_error_with_retry(
             f"[{mode.upper()} RETRY] {status_code} error encountered, retrying "
             f"(attempt {attempt + 1}/{max_retries})"
         )
-        await asyncio.sleep(retry_interval)
         return True
 
     # 其他错误不进行重试
@@ -129,14 +174,18 @@ async def handle_error_with_retry(
 async def get_retry_config() -> Dict[str, Any]:
     """
     获取重试配置
+
+    请求入口处读取一次，重试循环内复用（包括自动封禁判断），避免每次出错重新读取配置
     
     Returns:
-        包含重试配置的字典
+        包含重试与自动封禁配置的字典
     """
     return {
         "retry_enabled": await get_retry_429_enabled(),
         "max_retries": await get_retry_429_max_retries(),
         "retry_interval": await get_retry_429_interval(),
+        "auto_ban_enabled": await get_auto_ban_enabled(),
+        "auto_ban_error_codes": await get_auto_ban_error_codes(),
     }
 
 
@@ -212,8 +261,12 @@ async def parse_and_log_cooldown(
     Returns:
         冷却截止时间（Unix时间戳），如果解析失败则返回None
     """
+    # 只有带 quotaResetTimeStamp 的错误体才能解析出冷却时间（多数 429 只是限流），其余直接跳过 JSON 解析
+    if "quotaResetTimeStamp" not in error_text:
+        return None
+
     try:
-        error_data = json.loads(error_text)
+        error_data = json_loads(error_text)
         cooldown_until = parse_quota_reset_timestamp(error_data)
         if cooldown_until:
             log.info(
@@ -271,6 +324,8 @@ async def collect_streaming_response(stream_generator) -> Response:
     line_count = 0
 
     log.debug("[STREAM COLLECTOR] Starting to collect streaming response")
+    # 每个流只判断一次，未开启 debug 时跳过逐行/逐 part 的日志字符串格式化与切片
+    debug_enabled = log.is_enabled("debug")
 
     try:
         async for line in stream_generator:
@@ -278,35 +333,44 @@ async def collect_streaming_response(stream_generator) -> Response:
 
             # 如果收到的是Response对象（错误），直接返回
             if isinstance(line, Response):
-                log.debug(f"[STREAM COLLECTOR] 收到错误Response，状态码: {line.status_code}")
+                if debug_enabled:
+                    log.debug(f"[STREAM COLLECTOR] 收到错误Response，状态码: {line.status_code}")
                 return line
 
             # 处理 bytes 类型
             if isinstance(line, bytes):
                 line_str = line.decode('utf-8', errors='ignore')
-                log.debug(f"[STREAM COLLECTOR] Processing bytes line {line_count}: {line_str[:200] if line_str else 'empty'}")
+                if debug_enabled:
+                    log.debug(f"[STREAM COLLECTOR] Processing bytes line {line_count}: {line_str[:200] if line_str else 'empty'}")
             elif isinstance(line, str):
                 line_str = line
-                log.debug(f"[STREAM COLLECTOR] Processing line {line_count}: {line_str[:200] if line_str else 'empty'}")
+                if debug_enabled:
+                    log.debug(f"[STREAM COLLECTOR] Processing line {line_count}: {line_str[:200] if line_str else 'empty'}")
             else:
-                log.debug(f"[STREAM COLLECTOR] Skipping non-string/bytes line: {type(line)}")
+                if debug_enabled:
+                    log.debug(f"[STREAM COLLECTOR] Skipping non-string/bytes line: {type(line)}")
                 continue
 
             # 解析流式数据行
             if not line_str.startswith("data: "):
-                log.debug(f"[STREAM COLLECTOR] Skipping line without 'data: ' prefix: {line_str[:100]}")
+                if debug_enabled:
+                    log.debug(f"[STREAM COLLECTOR] Skipping line without 'data: ' prefix: {line_str[:100]}")
                 continue
 
-            raw = line_str[6:].strip()
-            if raw == "[DONE]":
+            # JSON 解析本身容忍首尾空白，无需 strip() 复制一份；
+            # 合法 JSON 不可能以 [DONE] 开头，用前缀判断结束标记
+            raw = line_str[6:]
+            if raw.startswith("[DONE]"):
                 log.debug("[STREAM COLLECTOR] Received [DONE] marker")
                 break
 
             try:
-                log.debug(f"[STREAM COLLECTOR] Parsing JSON: {raw[:200]}")
-                chunk = json.loads(raw)
+                if debug_enabled:
+                    log.debug(f"[STREAM COLLECTOR] Parsing JSON: {raw[:200]}")
+                chunk = json_loads(raw)
                 has_data = True
-                log.debug(f"[STREAM COLLECTOR] Chunk keys: {chunk.keys() if isinstance(chunk, dict) else type(chunk)}")
+                if debug_enabled:
+                    log.debug(f"[STREAM COLLECTOR] Chunk keys: {chunk.keys() if isinstance(chunk, dict) else type(chunk)}")
 
                 # 提取响应对象
                 response_obj = chunk.get("response", {})
@@ -315,9 +379,11 @@ async def collect_streaming_response(stream_generator) -> Response:
                     response_obj = chunk  # 尝试直接使用chunk
 
                 candidates = response_obj.get("candidates", [])
-                log.debug(f"[STREAM COLLECTOR] Found {len(candidates)} candidates")
+                if debug_enabled:
+                    log.debug(f"[STREAM COLLECTOR] Found {len(candidates)} candidates")
                 if not candidates:
-                    log.debug(f"[STREAM COLLECTOR] No candidates in chunk, chunk structure: {list(chunk.keys()) if isinstance(chunk, dict) else type(chunk)}")
+                    if debug_enabled:
+                        log.debug(f"[STREAM COLLECTOR] No candidates in chunk, chunk structure: {list(chunk.keys()) if isinstance(chunk, dict) else type(chunk)}")
                     continue
 
                 candidate = candidates[0]
@@ -325,7 +391,8 @@ async def collect_streaming_response(stream_generator) -> Response:
                 # 收集文本内容
                 content = candidate.get("content", {})
                 parts = content.get("parts", [])
-                log.debug(f"[STREAM COLLECTOR] Processing {len(parts)} parts from candidate")
+                if debug_enabled:
+                    log.debug(f"[STREAM COLLECTOR] Processing {len(parts)} parts from candidate")
 
                 for part in parts:
                     if not isinstance(part, dict):
@@ -336,7 +403,8 @@ async def collect_streaming_response(stream_generator) -> Response:
                     if "functionCall" in part or "functionResponse" in part or "function_call" in part:
                         collected_other_parts.append(part)
                         collected_tool_parts_count += 1
-                        log.debug(f"[STREAM COLLECTOR] Collected tool part: {list(part.keys())}")
+                        if debug_enabled:
+                            log.debug(f"[STREAM COLLECTOR] Collected tool part: {list(part.keys())}")
                         continue
 
                     # 处理文本内容
@@ -345,14 +413,17 @@ async def collect_streaming_response(stream_generator) -> Response:
                         # 区分普通文本和思维链
                         if part.get("thought", False):
                             collected_thought_text.append(text)
-                            log.debug(f"[STREAM COLLECTOR] Collected thought text: {text[:100]}")
+                            if debug_enabled:
+                                log.debug(f"[STREAM COLLECTOR] Collected thought text: {text[:100]}")
                         else:
                             collected_text.append(text)
-                            log.debug(f"[STREAM COLLECTOR] Collected regular text: {text[:100]}")
+                            if debug_enabled:
+                                log.debug(f"[STREAM COLLECTOR] Collected regular text: {text[:100]}")
                     # 处理非文本内容（图片、文件等）
                     elif "inlineData" in part or "fileData" in part or "executableCode" in part or "codeExecutionResult" in part:
                         collected_other_parts.append(part)
-                        log.debug(f"[STREAM COLLECTOR] Collected non-text part: {list(part.keys())}")
+                        if debug_enabled:
+                            log.debug(f"[STREAM COLLECTOR] Collected non-text part: {list(part.keys())}")
 
                 # 收集其他信息（使用最后一个块的值）
                 if candidate.get("finishReason"):
@@ -370,10 +441,12 @@ async def collect_streaming_response(stream_generator) -> Response:
                     merged_response["response"]["usageMetadata"].update(usage)
 
             except json.JSONDecodeError as e:
-                log.debug(f"[STREAM COLLECTOR] Failed to parse JSON chunk: {e}")
+                if debug_enabled:
+                    log.debug(f"[STREAM COLLECTOR] Failed to parse JSON chunk: {e}")
                 continue
             except Exception as e:
-                log.debug(f"[STREAM COLLECTOR] Error processing chunk: {e}")
+                if debug_enabled:
+                    log.debug(f"[STREAM COLLECTOR] Error processing chunk: {e}")
                 continue
 
     except Exception as e:
@@ -433,7 +506,7 @@ async def collect_streaming_response(stream_generator) -> Response:
 
     # 返回纯JSON格式
     return Response(
-        content=json.dumps(merged_response, ensure_ascii=False).encode('utf-8'),
+        content=json_dumps_bytes(merged_response),
         status_code=200,
         headers={},
         media_type="application/json"
@@ -7,12 +7,12 @@ from __future__ import annotations
 
 import json
 import os
-import uuid
 from typing import Any, AsyncIterator, Dict, List, Optional
 
 from fastapi import Response
 from log import log
 from src.converter.utils import merge_system_messages
+from src.utils import json_dumps, json_dumps_bytes, json_loads, sequential_id
 
 from src.converter.thoughtSignature_fix import (
     encode_tool_id_with_signature,
@@ -163,7 +163,7 @@ def filter_invalid_thinking_blocks(messages: List[Dict[str, Any]]) -> None:
             else:
                 # 无效签名，将内容转换为 text 块
                 thinking_text = block.get("thinking", "")
-                if thinking_text and str(thinking_text).strip():
+                if thinking_text and _is_non_whitespace_text(thinking_text):
                     log.info(
                         f"[Claude-Handler] Converting thinking block with invalid thoughtSignature to text. "
                         f"Content length: {len(thinking_text)} chars"
@@ -194,6 +194,10 @@ def _anthropic_debug_enabled() -> bool:
     return str(os.getenv("ANTHROPIC_DEBUG", "true")).strip().lower() in _DEBUG_TRUE
 
 
+# 调试开关在进程生命周期内不变，导入时求值一次，避免每个流式分片重复读取环境变量
+_ANTHROPIC_DEBUG = _anthropic_debug_enabled()
+
+
 def _is_non_whitespace_text(value: Any) -> bool:
     """
     判断文本是否包含"非空白"内容。
@@ -204,111 +208,169 @@ def _is_non_whitespace_text(value: Any) -> bool:
     """
     if value is None:
         return False
+    # 常见情况已是 str：用 isspace() 判断，不必 str() 转换并 strip() 出一份副本
+    if type(value) is str:
+        return bool(value) and not value.isspace()
     try:
         return bool(str(value).strip())
     except Exception:
         return False
 
 
+def _as_token_count(value: Any) -> int:
+    """将 usageMetadata 中的 token 计数规范为 int；JSON 解析出的值通常已是 int，直接返回"""
+    if type(value) is int:
+        return value
+    return int(value or 0)
+
+
 def _remove_nulls_for_tool_input(value: Any) -> Any:
     """
     递归移除 dict/list 中值为 null/None 的字段/元素。
 
     背景：Roo/Kilo 在 Anthropic native tool 路径下，若收到 tool_use.input 中包含 null，
     可能会把 null 当作真实入参执行（例如"在 null 中搜索"）。
-    """
-    if isinstance(value, dict):
-        cleaned: Dict[str, Any] = {}
-        for k, v in value.items():
-            if v is None:
-                continue
-            cleaned[k] = _remove_nulls_for_tool_input(v)
-        return cleaned
-
-    if isinstance(value, list):
-        cleaned_list = []
-        for item in value:
-            if item is None:
-                continue
-            cleaned_list.append(_remove_nulls_for_tool_input(item))
-        return cleaned_list
 
-    return value
+    使用显式栈迭代实现：先在父容器中占位子容器再压栈填充，保持原有键/元素顺序，
+    避免深层嵌套参数逐节点的函数调用开销。
+    """
+    if not isinstance(value, (dict, list)):
+        return value
+
+    # 快速路径：只含非空标量的扁平参数（最常见情况）无需复制，直接原样返回
+    items = value.values() if isinstance(value, dict) else value
+    if not any(v is None or isinstance(v, (dict, list)) for v in items):
+        return value
+
+    root: Any = {} if isinstance(value, dict) else []
+    stack = [(value, root)]
+    while stack:
+        src, dst = stack.pop()
+        if isinstance(src, dict):
+            for k, v in src.items():
+                if v is None:
+                    continue
+                if isinstance(v, dict):
+                    child: Any = {}
+                    stack.append((v, child))
+                    v = child
+                elif isinstance(v, list):
+                    child = []
+                    stack.append((v, child))
+                    v = child
+                dst[k] = v
+        else:
+            for item in src:
+                if item is None:
+                    continue
+                if isinstance(item, dict):
+                    child = {}
+                    stack.append((item, child))
+                    item = child
+                elif isinstance(item, list):
+                    child = []
+                    stack.append((item, child))
+                    item = child
+                dst.append(item)
+
+    return root
 
 # ============================================================================
 # 2. JSON Schema 清理
 # ============================================================================
 
+# 下游不支持的字段
+_SCHEMA_UNSUPPORTED_KEYS = frozenset({
+    "$schema", "$id", "$ref", "$defs", "definitions", "title",
+    "example", "examples", "readOnly", "writeOnly", "default",
+    "exclusiveMaximum", "exclusiveMinimum", "oneOf", "anyOf", "allOf",
+    "const", "additionalItems", "contains", "patternProperties",
+    "dependencies", "propertyNames", "if", "then", "else",
+    "contentEncoding", "contentMediaType",
+})
+
+# 需追加到 description 的验证字段
+_SCHEMA_VALIDATION_FIELDS = ("minLength", "maxLength", "minimum", "maximum", "minItems", "maxItems")
+
+# 清理时需跳过的全部字段，合并为一个集合，每个键只做一次哈希查找
+_SCHEMA_SKIP_KEYS = _SCHEMA_UNSUPPORTED_KEYS | frozenset(_SCHEMA_VALIDATION_FIELDS) | {"additionalProperties"}
+
+
 def clean_json_schema(schema: Any) -> Any:
     """
     清理 JSON Schema，移除下游不支持的字段，并把验证要求追加到 description。
+
+    使用显式栈逐层处理嵌套的 dict（不递归调用），输入不会被修改。
     """
     if not isinstance(schema, dict):
         return schema
 
-    # 下游不支持的字段
-    unsupported_keys = {
-        "$schema", "$id", "$ref", "$defs", "definitions", "title",
-        "example", "examples", "readOnly", "writeOnly", "default",
-        "exclusiveMaximum", "exclusiveMinimum", "oneOf", "anyOf", "allOf",
-        "const", "additionalItems", "contains", "patternProperties",
-        "dependencies", "propertyNames", "if", "then", "else",
-        "contentEncoding", "contentMediaType",
-    }
+    root: Dict[str, Any] = {}
+    # (原始节点, 对应的清理结果)；子节点先放入空字典占位，出栈时再填充
+    stack = [(schema, root)]
+    pop = stack.pop
+    push = stack.append
 
-    validation_fields = {
-        "minLength": "minLength",
-        "maxLength": "maxLength",
-        "minimum": "minimum",
-        "maximum": "maximum",
-        "minItems": "minItems",
-        "maxItems": "maxItems",
-    }
-    fields_to_remove = {"additionalProperties"}
+    while stack:
+        node, cleaned = pop()
 
-    validations: List[str] = []
-    for field, label in validation_fields.items():
-        if field in schema:
-            validations.append(f"{label}: {schema[field]}")
+        validations: List[str] = []
+        for field in _SCHEMA_VALIDATION_FIELDS:
+            if field in node:
+                validations.append(f"{field}: {node[field]}")
 
-    cleaned: Dict[str, Any] = {}
-    for key, value in schema.items():
-        if key in unsupported_keys or key in fields_to_remove or key in validation_fields:
-            continue
+        for key, value in node.items():
+            if key in _SCHEMA_SKIP_KEYS:
+                continue
 
-        if key == "type" and isinstance(value, list):
-            # type: ["string", "null"] -> type: "string", nullable: true
-            has_null = any(
-                isinstance(t, str) and t.strip() and t.strip().lower() == "null" for t in value
-            )
-            non_null_types = [
-                t.strip()
-                for t in value
-                if isinstance(t, str) and t.strip() and t.strip().lower() != "null"
-            ]
-
-            cleaned[key] = non_null_types[0] if non_null_types else "string"
-            if has_null:
-                cleaned["nullable"] = True
-            continue
+            if key == "type" and isinstance(value, list):
+                # type: ["string", "null"] -> type: "string", nullable: true
+                # 单次遍历，每个元素只 strip 一次
+                has_null = False
+                non_null_types = []
+                for t in value:
+                    if not isinstance(t, str):
+                        continue
+                    t = t.strip()
+                    if not t:
+                        continue
+                    if t.lower() == "null":
+                        has_null = True
+                    else:
+                        non_null_types.append(t)
 
-        if key == "description" and validations:
-            cleaned[key] = f"{value} ({', '.join(validations)})"
-        elif isinstance(value, dict):
-            cleaned[key] = clean_json_schema(value)
-        elif isinstance(value, list):
-            cleaned[key] = [clean_json_schema(item) if isinstance(item, dict) else item for item in value]
-        else:
-            cleaned[key] = value
+                cleaned[key] = non_null_types[0] if non_null_types else "string"
+                if has_null:
+                    cleaned["nullable"] = True
+                continue
 
-    if validations and "description" not in cleaned:
-        cleaned["description"] = f"Validation: {', '.join(validations)}"
+            if key == "description" and validations:
+                cleaned[key] = f"{value} ({', '.join(validations)})"
+            elif isinstance(value, dict):
+                child: Dict[str, Any] = {}
+                cleaned[key] = child
+                push((value, child))
+            elif isinstance(value, list):
+                items = []
+                for item in value:
+                    if isinstance(item, dict):
+                        child = {}
+                        push((item, child))
+                        items.append(child)
+                    else:
+                        items.append(item)
+                cleaned[key] = items
+            else:
+                cleaned[key] = value
 
-    # 如果有 properties 但没有显式 type，则补齐为 object
-    if "properties" in cleaned and "type" not in cleaned:
-        cleaned["type"] = "object"
+        if validations and "description" not in cleaned:
+            cleaned["description"] = f"Validation: {', '.join(validations)}"
 
-    return cleaned
+        # 如果有 properties 但没有显式 type，则补齐为 object
+        if "properties" in cleaned and "type" not in cleaned:
+            cleaned["type"] = "object"
+
+    return root
 
 
 # ============================================================================
@@ -617,6 +679,16 @@ def convert_tool_choice_to_tool_config(tool_choice: Any) -> Optional[Dict[str, A
 # 8. Generation Config 构建
 # ============================================================================
 
+# 默认 stop sequences：使用元组在所有请求间共享，不再每次新建列表（下游只读取并序列化，不会修改）
+_DEFAULT_STOP_SEQUENCES = (
+    "<|user|>",
+    "<|bot|>",
+    "<|context_request|>",
+    "<|endoftext|>",
+    "<|end_of_turn|>",
+)
+
+
 def build_generation_config(payload: Dict[str, Any]) -> Dict[str, Any]:
     """
     根据 Anthropic Messages 请求构造下游 generationConfig。
@@ -627,13 +699,7 @@ def build_generation_config(payload: Dict[str, Any]) -> Dict[str, Any]:
     config: Dict[str, Any] = {
         "topP": 1,
         "candidateCount": 1,
-        "stopSequences": [
-            "<|user|>",
-            "<|bot|>",
-            "<|context_request|>",
-            "<|endoftext|>",
-            "<|end_of_turn|>",
-        ],
+        "stopSequences": _DEFAULT_STOP_SEQUENCES,
     }
 
     temperature = payload.get("temperature", None)
@@ -684,7 +750,7 @@ def build_generation_config(payload: Dict[str, Any]) -> Dict[str, Any]:
 
     stop_sequences = payload.get("stop_sequences")
     if isinstance(stop_sequences, list) and stop_sequences:
-        config["stopSequences"] = config["stopSequences"] + [str(s) for s in stop_sequences]
+        config["stopSequences"] = [*_DEFAULT_STOP_SEQUENCES, *(str(s) for s in stop_sequences)]
     elif is_plan_mode:
         # Plan mode 时清空默认 stop sequences，避免过早停止
         # 默认的 stop sequences 可能会导致模型在生成计划时过早停止
@@ -774,6 +840,31 @@ async def anthropic_to_gemini_request(payload: Dict[str, Any]) -> Dict[str, Any]
     return gemini_request
 
 
+def _tool_use_block(part: Dict[str, Any]) -> Dict[str, Any]:
+    """将含 functionCall 的 Gemini part 转换为 Anthropic tool_use 块（工具调用ID带签名编码）"""
+    fc = part["functionCall"] or {}
+    original_id = fc.get("id") or f"toolu_{sequential_id()}"
+    return {
+        "type": "tool_use",
+        "id": encode_tool_id_with_signature(original_id, part.get("thoughtSignature")),
+        "name": fc.get("name") or "",
+        "input": _remove_nulls_for_tool_input(fc.get("args", {}) or {}),
+    }
+
+
+def _image_block(part: Dict[str, Any]) -> Dict[str, Any]:
+    """将含 inlineData 的 Gemini part 转换为 Anthropic base64 image 块"""
+    inline = part["inlineData"] or {}
+    return {
+        "type": "image",
+        "source": {
+            "type": "base64",
+            "media_type": inline.get("mimeType", "image/png"),
+            "data": inline.get("data", ""),
+        },
+    }
+
+
 def gemini_to_anthropic_response(
     gemini_response: Dict[str, Any],
     model: str,
@@ -802,19 +893,17 @@ def gemini_to_anthropic_response(
     else:
         response_data = gemini_response
 
-    # 提取候选结果
-    candidate = response_data.get("candidates", [{}])[0] or {}
-    parts = candidate.get("content", {}).get("parts", []) or []
+    # 提取候选结果：入口处一次性归一化为 dict/list，后续访问无需再做防御判断
+    candidates = response_data.get("candidates") or [{}]
+    candidate = candidates[0] if isinstance(candidates[0], dict) else {}
+    parts = (candidate.get("content") or {}).get("parts") or []
 
-    # 获取 usage metadata
-    usage_metadata = {}
-    if "usageMetadata" in response_data:
-        usage_metadata = response_data["usageMetadata"]
-    elif "usageMetadata" in candidate:
-        usage_metadata = candidate["usageMetadata"]
+    # 获取 usage metadata（优先顶层，其次候选结果）
+    usage_metadata = response_data.get("usageMetadata") or candidate.get("usageMetadata")
 
-    # 转换内容块
-    content = []
+    # 转换内容块（绑定 append 到局部变量，省去每个 part 的属性查找）
+    content: List[Dict[str, Any]] = []
+    append_block = content.append
     has_tool_use = False
 
     for part in parts:
@@ -826,54 +915,35 @@ def gemini_to_anthropic_response(
             thinking_text = part.get("text", "")
             if thinking_text is None:
                 thinking_text = ""
-            
-            block: Dict[str, Any] = {"type": "thinking", "thinking": str(thinking_text)}
-            
-            # 如果有 thoughtsignature 则添加
+
+            # 一次性构建块字面量，有 thoughtsignature 时才带上该字段
             thoughtsignature = part.get("thoughtSignature")
             if thoughtsignature:
-                block["thoughtSignature"] = thoughtsignature
-            
-            content.append(block)
+                append_block(
+                    {
+                        "type": "thinking",
+                        "thinking": str(thinking_text),
+                        "thoughtSignature": thoughtsignature,
+                    }
+                )
+            else:
+                append_block({"type": "thinking", "thinking": str(thinking_text)})
             continue
 
         # 处理文本块
         if "text" in part:
-            content.append({"type": "text", "text": part.get("text", "")})
+            append_block({"type": "text", "text": part["text"]})
             continue
 
         # 处理工具调用
         if "functionCall" in part:
             has_tool_use = True
-            fc = part.get("functionCall", {}) or {}
-            original_id = fc.get("id") or f"toolu_{uuid.uuid4().hex}"
-            thoughtsignature = part.get("thoughtSignature")
-            
-            # 对工具调用ID进行签名编码
-            encoded_id = encode_tool_id_with_signature(original_id, thoughtsignature)
-            content.append(
-                {
-                    "type": "tool_use",
-                    "id": encoded_id,
-                    "name": fc.get("name") or "",
-                    "input": _remove_nulls_for_tool_input(fc.get("args", {}) or {}),
-                }
-            )
+            append_block(_tool_use_block(part))
             continue
 
         # 处理图片
         if "inlineData" in part:
-            inline = part.get("inlineData", {}) or {}
-            content.append(
-                {
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": inline.get("mimeType", "image/png"),
-                        "data": inline.get("data", ""),
-                    },
-                }
-            )
+            append_block(_image_block(part))
             continue
 
     # 确定停止原因
@@ -889,12 +959,15 @@ def gemini_to_anthropic_response(
         # 其他情况（SAFETY、RECITATION 等）默认为 end_turn
         stop_reason = "end_turn"
 
-    # 提取 token 使用情况
-    input_tokens = usage_metadata.get("promptTokenCount", 0) if isinstance(usage_metadata, dict) else 0
-    output_tokens = usage_metadata.get("candidatesTokenCount", 0) if isinstance(usage_metadata, dict) else 0
+    # 提取 token 使用情况（只做一次类型判断）
+    if isinstance(usage_metadata, dict):
+        input_tokens = _as_token_count(usage_metadata.get("promptTokenCount"))
+        output_tokens = _as_token_count(usage_metadata.get("candidatesTokenCount"))
+    else:
+        input_tokens = output_tokens = 0
 
     # 构建 Anthropic 响应
-    message_id = f"msg_{uuid.uuid4().hex}"
+    message_id = f"msg_{sequential_id()}"
 
     return {
         "id": message_id,
@@ -905,8 +978,8 @@ def gemini_to_anthropic_response(
         "stop_reason": stop_reason,
         "stop_sequence": None,
         "usage": {
-            "input_tokens": int(input_tokens or 0),
-            "output_tokens": int(output_tokens or 0),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
         },
     }
 
@@ -936,7 +1009,7 @@ async def gemini_stream_to_anthropic_stream(
         return
 
     # 初始化状态
-    message_id = f"msg_{uuid.uuid4().hex}"
+    message_id = f"msg_{sequential_id()}"
     message_start_sent = False
     current_block_type: Optional[str] = None
     current_block_index = -1
@@ -945,11 +1018,32 @@ async def gemini_stream_to_anthropic_stream(
     input_tokens = 0
     output_tokens = 0
     finish_reason: Optional[str] = None
+    debug_enabled = log.is_enabled("debug")  # 每个流只判断一次，未开启时跳过逐 chunk 的日志格式化
 
     def _sse_event(event: str, data: Dict[str, Any]) -> bytes:
-        """生成 SSE 事件"""
-        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
-        return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
+        """生成 SSE 事件（直接拼接 bytes，省去 str 中转与再次编码）"""
+        return b"event: " + event.encode("ascii") + b"\ndata: " + json_dumps_bytes(data) + b"\n\n"
+
+    # 同一个上游 chunk 产生的多个 SSE 事件先缓冲，处理完该 chunk 后合并为一次 yield，
+    # 减少 StreamingResponse 的 ASGI send 次数；不引入计时器，不增加首字延迟
+    pending_events: List[bytes] = []
+
+    def _emit(event: str, data: Dict[str, Any]) -> None:
+        """缓冲一个 SSE 事件"""
+        pending_events.append(_sse_event(event, data))
+
+    # 逐 token 的文本 / thinking 增量事件复用同一个模板字典，只改写 index 与文本字段；
+    # _emit 会立即序列化，之后再改写模板不影响已缓冲的事件
+    text_delta_delta: Dict[str, Any] = {"type": "text_delta", "text": ""}
+    text_delta_event: Dict[str, Any] = {"type": "content_block_delta", "index": 0, "delta": text_delta_delta}
+    thinking_delta_delta: Dict[str, Any] = {"type": "thinking_delta", "thinking": ""}
+    thinking_delta_event: Dict[str, Any] = {"type": "content_block_delta", "index": 0, "delta": thinking_delta_delta}
+
+    def _drain_events() -> bytes:
+        """取出并清空已缓冲的事件"""
+        data = b"".join(pending_events)
+        pending_events.clear()
+        return data
 
     def _close_block() -> Optional[bytes]:
         """关闭当前内容块"""
@@ -975,23 +1069,28 @@ async def gemini_stream_to_anthropic_stream(
                 return
 
             # 记录接收到的原始chunk
-            log.debug(f"[GEMINI_TO_ANTHROPIC] Raw chunk: {chunk[:200] if chunk else b''}")
+            if debug_enabled:
+                log.debug(f"[GEMINI_TO_ANTHROPIC] Raw chunk: {chunk[:200] if chunk else b''}")
 
             # 解析 Gemini 流式块
             if not chunk or not chunk.startswith(b"data: "):
                 log.debug(f"[GEMINI_TO_ANTHROPIC] Skipping chunk (not SSE format or empty)")
                 continue
 
-            raw = chunk[6:].strip()
-            if raw == b"[DONE]":
+            # JSON 解析本身容忍首尾空白，无需 strip() 复制一份；
+            # 合法 JSON 不可能以 [DONE] 开头，用前缀判断结束标记
+            raw = chunk[6:]
+            if raw.startswith(b"[DONE]"):
                 log.debug(f"[GEMINI_TO_ANTHROPIC] Received [DONE] marker")
                 break
 
-            log.debug(f"[GEMINI_TO_ANTHROPIC] Parsing JSON: {raw[:200]}")
+            if debug_enabled:
+                log.debug(f"[GEMINI_TO_ANTHROPIC] Parsing JSON: {raw[:200]}")
 
             try:
-                data = json.loads(raw.decode('utf-8', errors='ignore'))
-                log.debug(f"[GEMINI_TO_ANTHROPIC] Parsed data: {json.dumps(data, ensure_ascii=False)[:300]}")
+                data = json_loads(raw)
+                if debug_enabled:
+                    log.debug(f"[GEMINI_TO_ANTHROPIC] Parsed data keys: {list(data.keys()) if isinstance(data, dict) else type(data)}")
             except Exception as e:
                 log.warning(f"[GEMINI_TO_ANTHROPIC] JSON parse error: {e}")
                 continue
@@ -1010,14 +1109,14 @@ async def gemini_stream_to_anthropic_stream(
                 usage = response["usageMetadata"]
                 if isinstance(usage, dict):
                     if "promptTokenCount" in usage:
-                        input_tokens = int(usage.get("promptTokenCount", 0) or 0)
+                        input_tokens = _as_token_count(usage["promptTokenCount"])
                     if "candidatesTokenCount" in usage:
-                        output_tokens = int(usage.get("candidatesTokenCount", 0) or 0)
+                        output_tokens = _as_token_count(usage["candidatesTokenCount"])
 
             # 发送 message_start（仅一次）
             if not message_start_sent:
                 message_start_sent = True
-                yield _sse_event(
+                _emit(
                     "message_start",
                     {
                         "type": "message_start",
@@ -1048,7 +1147,7 @@ async def gemini_stream_to_anthropic_stream(
                     if current_block_type != "thinking":
                         close_evt = _close_block()
                         if close_evt:
-                            yield close_evt
+                            pending_events.append(close_evt)
 
                         current_block_index += 1
                         current_block_type = "thinking"
@@ -1057,7 +1156,7 @@ async def gemini_stream_to_anthropic_stream(
                         block: Dict[str, Any] = {"type": "thinking", "thinking": ""}
                         if thoughtsignature:
                             block["thoughtSignature"] = thoughtsignature
-                        yield _sse_event(
+                        _emit(
                             "content_block_start",
                             {
                                 "type": "content_block_start",
@@ -1069,7 +1168,7 @@ async def gemini_stream_to_anthropic_stream(
                         # 签名变化，需要开启新的 thinking 块
                         close_evt = _close_block()
                         if close_evt:
-                            yield close_evt
+                            pending_events.append(close_evt)
                         
                         current_block_index += 1
                         current_block_type = "thinking"
@@ -1079,7 +1178,7 @@ async def gemini_stream_to_anthropic_stream(
                         if thoughtsignature:
                             block_new["thoughtSignature"] = thoughtsignature
                         
-                        yield _sse_event(
+                        _emit(
                             "content_block_start",
                             {
                                 "type": "content_block_start",
@@ -1090,31 +1189,27 @@ async def gemini_stream_to_anthropic_stream(
 
                     # 发送 thinking 文本增量
                     if thinking_text:
-                        yield _sse_event(
-                            "content_block_delta",
-                            {
-                                "type": "content_block_delta",
-                                "index": current_block_index,
-                                "delta": {"type": "thinking_delta", "thinking": thinking_text},
-                            },
-                        )
+                        thinking_delta_event["index"] = current_block_index
+                        thinking_delta_delta["thinking"] = thinking_text
+                        _emit("content_block_delta", thinking_delta_event)
                     continue
 
                 # 处理文本块
                 if "text" in part:
-                    text = part.get("text", "")
-                    if isinstance(text, str) and not text.strip():
+                    text = part["text"]
+                    # 跳过空白文本：isspace() 不像 strip() 那样为每个增量分配新字符串
+                    if isinstance(text, str) and (not text or text.isspace()):
                         continue
 
                     if current_block_type != "text":
                         close_evt = _close_block()
                         if close_evt:
-                            yield close_evt
+                            pending_events.append(close_evt)
 
                         current_block_index += 1
                         current_block_type = "text"
 
-                        yield _sse_event(
+                        _emit(
                             "content_block_start",
                             {
                                 "type": "content_block_start",
@@ -1124,31 +1219,26 @@ async def gemini_stream_to_anthropic_stream(
                         )
 
                     if text:
-                        yield _sse_event(
-                            "content_block_delta",
-                            {
-                                "type": "content_block_delta",
-                                "index": current_block_index,
-                                "delta": {"type": "text_delta", "text": text},
-                            },
-                        )
+                        text_delta_event["index"] = current_block_index
+                        text_delta_delta["text"] = text
+                        _emit("content_block_delta", text_delta_event)
                     continue
 
                 # 处理工具调用
                 if "functionCall" in part:
                     close_evt = _close_block()
                     if close_evt:
-                        yield close_evt
+                        pending_events.append(close_evt)
 
                     has_tool_use = True
-                    fc = part.get("functionCall", {}) or {}
-                    original_id = fc.get("id") or f"toolu_{uuid.uuid4().hex}"
+                    fc = part["functionCall"] or {}
+                    original_id = fc.get("id") or f"toolu_{sequential_id()}"
                     thoughtsignature = part.get("thoughtSignature")
                     tool_id = encode_tool_id_with_signature(original_id, thoughtsignature)
                     tool_name = fc.get("name") or ""
                     tool_args = _remove_nulls_for_tool_input(fc.get("args", {}) or {})
 
-                    if _anthropic_debug_enabled():
+                    if _ANTHROPIC_DEBUG:
                         log.info(
                             f"[ANTHROPIC][tool_use] 处理工具调用: name={tool_name}, "
                             f"id={tool_id}, has_signature={thoughtsignature is not None}"
@@ -1157,7 +1247,7 @@ async def gemini_stream_to_anthropic_stream(
                     current_block_index += 1
                     # 注意：工具调用不设置 current_block_type，因为它是独立完整的块
 
-                    yield _sse_event(
+                    _emit(
                         "content_block_start",
                         {
                             "type": "content_block_start",
@@ -1171,8 +1261,8 @@ async def gemini_stream_to_anthropic_stream(
                         },
                     )
 
-                    input_json = json.dumps(tool_args, ensure_ascii=False, separators=(",", ":"))
-                    yield _sse_event(
+                    input_json = json_dumps(tool_args)
+                    _emit(
                         "content_block_delta",
                         {
                             "type": "content_block_delta",
@@ -1181,17 +1271,21 @@ async def gemini_stream_to_anthropic_stream(
                         },
                     )
 
-                    yield _sse_event(
+                    _emit(
                         "content_block_stop",
                         {"type": "content_block_stop", "index": current_block_index},
                     )
                     # 工具调用块已完全关闭，current_block_type 保持为 None
                     
-                    if _anthropic_debug_enabled():
+                    if _ANTHROPIC_DEBUG:
                         log.info(f"[ANTHROPIC][tool_use] 工具调用块已关闭: index={current_block_index}")
                     
                     continue
 
+            # 本 chunk 产生的事件合并发送
+            if pending_events:
+                yield _drain_events()
+
             # 检查是否结束
             if candidate.get("finishReason"):
                 finish_reason = candidate.get("finishReason")
@@ -1200,7 +1294,7 @@ async def gemini_stream_to_anthropic_stream(
         # 关闭最后的内容块
         close_evt = _close_block()
         if close_evt:
-            yield close_evt
+            pending_events.append(close_evt)
 
         # 确定停止原因
         # 只有在正常停止（STOP）且有工具调用时才设为 tool_use
@@ -1213,7 +1307,7 @@ async def gemini_stream_to_anthropic_stream(
             # 其他情况（SAFETY、RECITATION 等）默认为 end_turn
             stop_reason = "end_turn"
 
-        if _anthropic_debug_enabled():
+        if _ANTHROPIC_DEBUG:
             log.info(
                 f"[ANTHROPIC][stream_end] 流式结束: stop_reason={stop_reason}, "
                 f"has_tool_use={has_tool_use}, finish_reason={finish_reason}, "
@@ -1221,7 +1315,7 @@ async def gemini_stream_to_anthropic_stream(
             )
 
         # 发送 message_delta 和 message_stop
-        yield _sse_event(
+        _emit(
             "message_delta",
             {
                 "type": "message_delta",
@@ -1232,13 +1326,14 @@ async def gemini_stream_to_anthropic_stream(
             },
         )
 
-        yield _sse_event("message_stop", {"type": "message_stop"})
+        _emit("message_stop", {"type": "message_stop"})
+        yield _drain_events()
 
     except Exception as e:
         log.error(f"[ANTHROPIC] 流式转换失败: {e}")
         # 发送错误事件
         if not message_start_sent:
-            yield _sse_event(
+            _emit(
                 "message_start",
                 {
                     "type": "message_start",
@@ -1254,7 +1349,8 @@ async def gemini_stream_to_anthropic_stream(
                     },
                 },
             )
-        yield _sse_event(
+        _emit(
             "error",
             {"type": "error", "error": {"type": "api_error", "message": str(e)}},
-        )
\ No newline at end of file
+        )
+        yield _drain_events()
\ No newline at end of file
@@ -422,7 +422,8 @@ class AntiTruncationStreamProcessor:
 
     def _extract_content_from_chunk(self, data: Dict[str, Any]) -> str:
         """从chunk数据中提取文本内容"""
-        content = ""
+        # 收集片段后一次性拼接，避免逐段 += 产生的中间字符串
+        texts = []
 
         # 先尝试解包 response 字段（Gemini API 格式）
         if "response" in data:
@@ -435,7 +436,7 @@ class AntiTruncationStreamProcessor:
                     parts = candidate["content"].get("parts", [])
                     for part in parts:
                         if "text" in part:
-                            content += part["text"]
+                            texts.append(part["text"])
         
         # 处理 OpenAI 流式格式（choices/delta）
         elif "choices" in data:
@@ -443,9 +444,9 @@ class AntiTruncationStreamProcessor:
                 if "delta" in choice and "content" in choice["delta"]:
                     delta_content = choice["delta"]["content"]
                     if delta_content:
-                        content += delta_content
+                        texts.append(delta_content)
 
-        return content
+        return "".join(texts)
 
     async def _handle_non_streaming_response(self, response) -> bytes:
         """处理非流式响应 - 使用循环代替递归避免栈溢出"""
@@ -545,7 +546,7 @@ class AntiTruncationStreamProcessor:
 
     def _extract_content_from_response(self, data: Dict[str, Any]) -> str:
         """从响应数据中提取文本内容"""
-        content = ""
+        texts = []
 
         # 先尝试解包 response 字段（Gemini API 格式）
         if "response" in data:
@@ -558,15 +559,15 @@ class AntiTruncationStreamProcessor:
                     parts = candidate["content"].get("parts", [])
                     for part in parts:
                         if "text" in part:
-                            content += part["text"]
+                            texts.append(part["text"])
 
         # 处理OpenAI格式
         elif "choices" in data:
             for choice in data["choices"]:
                 if "message" in choice and "content" in choice["message"]:
-                    content += choice["message"]["content"]
+                    texts.append(choice["message"]["content"])
 
-        return content
+        return "".join(texts)
 
     def _remove_done_marker_from_line(self, line: bytes, line_str: str, data: Dict[str, Any]) -> bytes:
         """从行中移除[done]标记"""
@@ -592,43 +593,34 @@ class AntiTruncationStreamProcessor:
             
             log.debug(f"Anti-truncation: inner_data keys={list(inner_data.keys())}")
 
-            log.debug(f"Anti-truncation: inner_data keys={list(inner_data.keys())}")
-
             # 处理Gemini格式
             if "candidates" in inner_data:
                 log.info(f"Anti-truncation: Processing Gemini format to remove [done] marker")
-                modified_inner = inner_data.copy()
-                modified_inner["candidates"] = []
+                # 只替换需要修改的字段：用 {**d, key: value} 一次构建新字典，代替 copy() 后再赋值
+                modified_candidates = []
+                last_index = len(inner_data["candidates"]) - 1
 
                 for i, candidate in enumerate(inner_data["candidates"]):
-                    modified_candidate = candidate.copy()
                     # 只在最后一个candidate中清理[done]标记
-                    is_last_candidate = i == len(inner_data["candidates"]) - 1
-
-                    if "content" in candidate:
-                        modified_content = candidate["content"].copy()
-                        if "parts" in modified_content:
-                            modified_parts = []
-                            for part in modified_content["parts"]:
-                                if "text" in part and isinstance(part["text"], str):
-                                    modified_part = part.copy()
-                                    original_text = part["text"]
-                                    # 只在最后一个candidate中清理[done]标记
-                                    if is_last_candidate:
-                                        modified_part["text"] = done_pattern.sub("", part["text"])
-                                        if "[done]" in original_text.lower():
-                                            log.debug(f"Anti-truncation: Removed [done] from text: '{original_text[:100]}' -> '{modified_part['text'][:100]}'")
-                                    modified_parts.append(modified_part)
-                                else:
-                                    modified_parts.append(part)
-                            modified_content["parts"] = modified_parts
-                        modified_candidate["content"] = modified_content
-                    modified_inner["candidates"].append(modified_candidate)
+                    if i == last_index and "content" in candidate and "parts" in candidate["content"]:
+                        modified_parts = []
+                        for part in candidate["content"]["parts"]:
+                            if "text" in part and isinstance(part["text"], str):
+                                original_text = part["text"]
+                                modified_text = done_pattern.sub("", original_text)
+                                if "[done]" in original_text.lower():
+                                    log.debug(f"Anti-truncation: Removed [done] from text: '{original_text[:100]}' -> '{modified_text[:100]}'")
+                                modified_parts.append({**part, "text": modified_text})
+                            else:
+                                modified_parts.append(part)
+                        candidate = {**candidate, "content": {**candidate["content"], "parts": modified_parts}}
+                    modified_candidates.append(candidate)
+
+                modified_inner = {**inner_data, "candidates": modified_candidates}
 
                 # 如果有 response 包裹层，需要重新包装
                 if has_response_wrapper:
-                    modified_data = data.copy()
-                    modified_data["response"] = modified_inner
+                    modified_data = {**data, "response": modified_inner}
                 else:
                     modified_data = modified_inner
 
@@ -640,25 +632,22 @@ class AntiTruncationStreamProcessor:
 
             # 处理OpenAI格式
             elif "choices" in inner_data:
-                modified_inner = inner_data.copy()
-                modified_inner["choices"] = []
+                modified_choices = []
 
                 for choice in inner_data["choices"]:
-                    modified_choice = choice.copy()
                     if "delta" in choice and "content" in choice["delta"]:
-                        modified_delta = choice["delta"].copy()
-                        modified_delta["content"] = done_pattern.sub("", choice["delta"]["content"])
-                        modified_choice["delta"] = modified_delta
+                        delta = choice["delta"]
+                        choice = {**choice, "delta": {**delta, "content": done_pattern.sub("", delta["content"])}}
                     elif "message" in choice and "content" in choice["message"]:
-                        modified_message = choice["message"].copy()
-                        modified_message["content"] = done_pattern.sub("", choice["message"]["content"])
-                        modified_choice["message"] = modified_message
-                    modified_inner["choices"].append(modified_choice)
+                        message = choice["message"]
+                        choice = {**choice, "message": {**message, "content": done_pattern.sub("", message["content"])}}
+                    modified_choices.append(choice)
+
+                modified_inner = {**inner_data, "choices": modified_choices}
 
                 # 如果有 response 包裹层，需要重新包装
                 if has_response_wrapper:
-                    modified_data = data.copy()
-                    modified_data["response"] = modified_inner
+                    modified_data = {**data, "response": modified_inner}
                 else:
                     modified_data = modified_inner
 
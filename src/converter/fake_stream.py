@@ -1,7 +1,8 @@
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 import json
 from src.converter.utils import extract_content_and_reasoning
 from log import log
+from src.utils import json_dumps, sequential_id
 from src.converter.openai2gemini import _convert_usage_metadata
 
 def safe_get_nested(obj: Any, *keys: str, default: Any = None) -> Any:
@@ -32,8 +33,6 @@ def parse_response_for_fake_stream(response_data: Dict[str, Any]) -> tuple:
     Returns:
         (content, reasoning_content, finish_reason, images): 内容、推理内容、结束原因和图片数据的元组
     """
-    import json
-
     # 处理GeminiCLI的response包装格式
     if "response" in response_data and "candidates" not in response_data:
         log.debug(f"[FAKE_STREAM] Unwrapping response field")
@@ -47,7 +46,7 @@ def parse_response_for_fake_stream(response_data: Dict[str, Any]) -> tuple:
     candidate = candidates[0]
     finish_reason = candidate.get("finishReason", "STOP")
     parts = safe_get_nested(candidate, "content", "parts", default=[])
-    log.debug(f"[FAKE_STREAM] Extracted {len(parts)} parts: {json.dumps(parts, ensure_ascii=False)}")
+    log.debug(f"[FAKE_STREAM] Extracted {len(parts)} parts: {json_dumps(parts)}")
     content, reasoning_content, images = extract_content_and_reasoning(parts)
     log.debug(f"[FAKE_STREAM] Content length: {len(content)}, Reasoning length: {len(reasoning_content)}, Images count: {len(images)}")
 
@@ -273,20 +272,24 @@ def build_openai_fake_stream_chunks(content: str, reasoning_content: str, finish
     elif finish_reason in ["SAFETY", "RECITATION"]:
         openai_finish_reason = "content_filter"
 
-    # 如果没有正常内容但有思维内容，提供默认回复
-    if not content:
-        default_text = "[模型正在思考中，请稍后再试或重新提问]" if reasoning_content else "[响应为空，请重新尝试]"
-        return [{
+    def make_chunk(delta: Dict[str, Any], chunk_finish: Optional[str]) -> Dict[str, Any]:
+        # 三类 chunk 只有 delta 与 finish_reason 不同，外层字段统一在此构建
+        return {
             "id": response_id,
             "object": "chat.completion.chunk",
             "created": created,
             "model": model,
             "choices": [{
                 "index": 0,
-                "delta": {"content": default_text},
-                "finish_reason": openai_finish_reason,
+                "delta": delta,
+                "finish_reason": chunk_finish,
             }]
-        }]
+        }
+
+    # 如果没有正常内容但有思维内容，提供默认回复
+    if not content:
+        default_text = "[模型正在思考中，请稍后再试或重新提问]" if reasoning_content else "[响应为空，请重新尝试]"
+        return [make_chunk({"content": default_text}, openai_finish_reason)]
 
     # 分块发送主要内容
     first_chunk = True
@@ -295,28 +298,12 @@ def build_openai_fake_stream_chunks(content: str, reasoning_content: str, finish
         is_last_chunk = (i + chunk_size >= len(content)) and not reasoning_content
         chunk_finish = openai_finish_reason if is_last_chunk else None
 
-        delta_content = {}
-
         # 如果是第一个chunk且有图片，构建包含图片的content数组
         if first_chunk and images:
-            delta_content["content"] = images + [{"type": "text", "text": chunk_text}]
+            chunks.append(make_chunk({"content": images + [{"type": "text", "text": chunk_text}]}, chunk_finish))
             first_chunk = False
         else:
-            delta_content["content"] = chunk_text
-
-        chunk_data = {
-            "id": response_id,
-            "object": "chat.completion.chunk",
-            "created": created,
-            "model": model,
-            "choices": [{
-                "index": 0,
-                "delta": delta_content,
-                "finish_reason": chunk_finish,
-            }]
-        }
-        log.debug(f"[build_openai_fake_stream_chunks] Generated chunk: {chunk_data}")
-        chunks.append(chunk_data)
+            chunks.append(make_chunk({"content": chunk_text}, chunk_finish))
 
     # 如果有推理内容，分块发送（使用 reasoning_content 字段）
     if reasoning_content:
@@ -325,17 +312,7 @@ def build_openai_fake_stream_chunks(content: str, reasoning_content: str, finish
             is_last_chunk = i + chunk_size >= len(reasoning_content)
             chunk_finish = openai_finish_reason if is_last_chunk else None
 
-            chunks.append({
-                "id": response_id,
-                "object": "chat.completion.chunk",
-                "created": created,
-                "model": model,
-                "choices": [{
-                    "index": 0,
-                    "delta": {"reasoning_content": chunk_text},
-                    "finish_reason": chunk_finish,
-                }]
-            })
+            chunks.append(make_chunk({"reasoning_content": chunk_text}, chunk_finish))
 
     log.debug(f"[build_openai_fake_stream_chunks] Total chunks generated: {len(chunks)}")
     return chunks
@@ -367,14 +344,12 @@ def build_anthropic_fake_stream_chunks(content: str, reasoning_content: str, fin
     Returns:
         Anthropic SSE 格式的响应数据块列表
     """
-    import uuid
-
     if images is None:
         images = []
 
     log.debug(f"[build_anthropic_fake_stream_chunks] Input - content: {repr(content)}, reasoning: {repr(reasoning_content)}, finish_reason: {finish_reason}, images count: {len(images)}")
     chunks = []
-    message_id = f"msg_{uuid.uuid4().hex}"
+    message_id = f"msg_{sequential_id()}"
 
     # 映射 Gemini finish_reason 到 Anthropic 格式
     anthropic_stop_reason = "end_turn"
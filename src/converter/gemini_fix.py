@@ -3,6 +3,7 @@ Gemini Format Utilities - 统一的 Gemini 格式处理和转换工具
 提供对 Gemini API 请求体和响应的标准化处理
 ────────────────────────────────────────────────────────────────
 """
+from functools import lru_cache
 from math import e
 from typing import Any, Dict, Optional
 
@@ -63,6 +64,11 @@ def prepare_image_generation_request(
 
 # ==================== 模型特性辅助函数 ====================
 
+# 以下函数只依赖模型名，每个请求都会调用；模型名取值有限，用有界 LRU 缓存结果
+_MODEL_NAME_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=_MODEL_NAME_CACHE_SIZE)
 def get_base_model_name(model_name: str) -> str:
     """移除模型名称中的后缀,返回基础模型名"""
     # 按照从长到短的顺序排列，避免短后缀先于长后缀被匹配
@@ -84,6 +90,7 @@ def get_base_model_name(model_name: str) -> str:
     return result
 
 
+@lru_cache(maxsize=_MODEL_NAME_CACHE_SIZE)
 def get_thinking_settings(model_name: str) -> tuple[Optional[int], Optional[str]]:
     """
     根据模型名称获取思考配置
@@ -167,6 +174,7 @@ def is_search_model(model_name: str) -> bool:
 
 # ==================== 统一的 Gemini 请求后处理 ====================
 
+@lru_cache(maxsize=_MODEL_NAME_CACHE_SIZE)
 def is_thinking_model(model_name: str) -> bool:
     """检查是否为思考模型 (包含 -thinking 或 pro)"""
     return "think" in model_name or "pro" in model_name.lower()
@@ -4,6 +4,7 @@ OpenAI Transfer Module - Handles conversion between OpenAI and Gemini API format
 """
 
 import json
+import re
 import time
 import uuid
 from typing import Any, Dict, List, Optional, Tuple, Union
@@ -15,9 +16,15 @@ from src.converter.thoughtSignature_fix import (
     decode_tool_id_and_signature,
 )
 from src.converter.utils import merge_system_messages
+from src.utils import json_dumps_bytes, json_loads
 
 from log import log
 
+# 函数名规范化与图片 data URL 解析用到的正则，模块加载时编译一次
+_CJK_CHAR_RE = re.compile(r"[\u4e00-\u9fff]")
+_INVALID_FUNCTION_NAME_CHARS_RE = re.compile(r"[^a-zA-Z0-9_.\-]")
+_IMAGE_SUBTYPE_RE = re.compile(r"\w+")
+
 def _convert_usage_metadata(usage_metadata: Dict[str, Any]) -> Dict[str, int]:
     """
     将Gemini的usageMetadata转换为OpenAI格式的usage字段
@@ -95,13 +102,11 @@ def _normalize_function_name(name: str) -> str:
     Returns:
         规范化后的函数名
     """
-    import re
-
     if not name:
         return "_unnamed_function"
 
     # 步骤1：转换中文字符为拼音
-    if re.search(r"[\u4e00-\u9fff]", name):
+    if _CJK_CHAR_RE.search(name):
         try:
             parts = []
             for char in name:
@@ -120,7 +125,7 @@ def _normalize_function_name(name: str) -> str:
 
     # 步骤2：将非法字符替换为下划线
     # 合法字符：a-z, A-Z, 0-9, _, ., -
-    normalized = re.sub(r"[^a-zA-Z0-9_.\-]", "_", normalized)
+    normalized = _INVALID_FUNCTION_NAME_CHARS_RE.sub("_", normalized)
 
     # 步骤3：确保以字母或下划线开头
     if normalized and not (normalized[0].isalpha() or normalized[0] == "_"):
@@ -845,7 +850,7 @@ def extract_tool_calls_from_parts(
         (tool_calls, text_content) 元组
     """
     tool_calls = []
-    text_content = ""
+    text_parts = []
 
     for idx, part in enumerate(parts):
         # 检查是否是函数调用
@@ -877,9 +882,10 @@ def extract_tool_calls_from_parts(
 
         # 提取文本内容（排除 thinking tokens）
         elif "text" in part and not part.get("thought", False):
-            text_content += part["text"]
+            text_parts.append(part["text"])
 
-    return tool_calls, text_content
+    # 文本片段统一 join，避免逐段拼接字符串
+    return tool_calls, "".join(text_parts)
 
 
 def extract_images_from_content(content: Any) -> Dict[str, Any]:
@@ -897,25 +903,35 @@ def extract_images_from_content(content: Any) -> Dict[str, Any]:
     if isinstance(content, str):
         result["text"] = content
     elif isinstance(content, list):
+        # 对字典项做 += 每次都会复制整段字符串，先收集片段最后 join
+        text_parts = []
         for item in content:
             if isinstance(item, dict):
                 if item.get("type") == "text":
-                    result["text"] += item.get("text", "")
+                    text_parts.append(item.get("text", ""))
                 elif item.get("type") == "image_url":
                     image_url = item.get("image_url", {}).get("url", "")
                     # 解析 data:image/png;base64,xxx 格式
+                    # 用 partition 拆分，避免正则整体扫描体积很大的 base64 数据
                     if image_url.startswith("data:image/"):
-                        import re
-                        match = re.match(r"^data:image/(\w+);base64,(.+)$", image_url)
-                        if match:
-                            mime_type = match.group(1)
-                            base64_data = match.group(2)
+                        header, sep, base64_data = image_url.partition(";base64,")
+                        mime_type = header[len("data:image/"):]
+                        # 与 ^data:image/(\w+);base64,(.+)$ 的匹配规则保持一致
+                        if base64_data.endswith("\n"):
+                            base64_data = base64_data[:-1]
+                        if (
+                            sep
+                            and base64_data
+                            and "\n" not in base64_data
+                            and _IMAGE_SUBTYPE_RE.fullmatch(mime_type)
+                        ):
                             result["images"].append({
                                 "inlineData": {
                                     "mimeType": f"image/{mime_type}",
                                     "data": base64_data
                                 }
                             })
+        result["text"] = "".join(text_parts)
 
     return result
 
@@ -996,17 +1012,7 @@ async def convert_openai_to_gemini_request(openai_request: Dict[str, Any]) -> Di
             if tool_call_id in tool_call_mapping:
                 func_name, original_id, _ = tool_call_mapping[tool_call_id]
             else:
-                # 如果没有name,尝试从消息列表中查找
-                if not func_name and tool_call_id:
-                    for msg in messages:
-                        if msg.get("role") == "assistant" and msg.get("tool_calls"):
-                            for tc in msg["tool_calls"]:
-                                if tc.get("id") == tool_call_id:
-                                    func_name = tc.get("function", {}).get("name")
-                                    break
-                            if func_name:
-                                break
-
+                # 映射表已收录所有 assistant 消息中带 id 的 tool_call，查不到时无需再逐条扫描消息列表
                 # 解码 tool_call_id 获取原始 ID
                 original_id, _ = decode_tool_id_and_signature(tool_call_id)
 
@@ -1370,12 +1376,31 @@ def convert_gemini_to_openai_response(
     return response_data
 
 
+def build_openai_stream_chunk_prefix(response_id: str, model: str, created: Optional[int] = None) -> bytes:
+    """
+    预序列化 OpenAI 流式块的固定字段，返回到 "choices": 为止的 JSON 前缀（不含结尾的 }）
+
+    id/object/created/model 在同一个流中不变，调用方在流开始时构建一次，
+    再通过 chunk_prefix 传给每次 convert_gemini_to_openai_stream 调用；created 为 None 时取当前时间
+    """
+    if created is None:
+        created = int(time.time())
+    envelope = json_dumps_bytes({
+        "id": response_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+    })
+    return envelope[:-1] + b',"choices":'
+
+
 def convert_gemini_to_openai_stream(
     gemini_stream_chunk: str,
     model: str,
     response_id: str,
-    status_code: int = 200
-) -> Optional[str]:
+    status_code: int = 200,
+    chunk_prefix: Optional[bytes] = None,
+) -> Optional[Union[str, bytes]]:
     """
     将 Gemini 格式流式响应块转换为 OpenAI SSE 格式流式响应
 
@@ -1386,9 +1411,11 @@ def convert_gemini_to_openai_stream(
         model: 模型名称
         response_id: 此流式响应的一致ID
         status_code: HTTP 状态码 (默认 200)
+        chunk_prefix: build_openai_stream_chunk_prefix 构建的流级前缀，由调用方在流开始时构建一次
+            并在各 chunk 间复用；为 None 时按 response_id / model / 当前时间现场构建
 
     Returns:
-        OpenAI SSE 格式的响应字符串 (如 "data: {json}\n\n"),
+        OpenAI SSE 格式的响应 bytes (如 b"data: {json}\n\n"，可直接交给 StreamingResponse),
         或原始内容 (如果状态码不是 2xx),
         或 None (如果解析失败)
     """
@@ -1398,24 +1425,19 @@ def convert_gemini_to_openai_stream(
 
     # 解析 Gemini 流式块
     try:
-        # 去除 "data: " 前缀
-        if isinstance(gemini_stream_chunk, bytes):
-            if gemini_stream_chunk.startswith(b"data: "):
-                payload_str = gemini_stream_chunk[len(b"data: "):].strip().decode("utf-8")
-            else:
-                payload_str = gemini_stream_chunk.strip().decode("utf-8")
+        # 去除 "data: " 前缀（str / bytes 均可直接交给 json_loads，首尾空白无需 strip）
+        prefix = b"data: " if isinstance(gemini_stream_chunk, bytes) else "data: "
+        if gemini_stream_chunk.startswith(prefix):
+            payload = gemini_stream_chunk[6:]
         else:
-            if gemini_stream_chunk.startswith("data: "):
-                payload_str = gemini_stream_chunk[len("data: "):].strip()
-            else:
-                payload_str = gemini_stream_chunk.strip()
+            payload = gemini_stream_chunk
 
         # 跳过空块
-        if not payload_str:
+        if not payload or payload.isspace():
             return None
 
         # 解析 JSON
-        gemini_chunk = json.loads(payload_str)
+        gemini_chunk = json_loads(payload)
     except (json.JSONDecodeError, UnicodeDecodeError):
         # 解析失败,跳过此块
         return None
@@ -1522,20 +1544,17 @@ def convert_gemini_to_openai_stream(
     # 转换 usageMetadata (只在流结束时存在)
     usage = _convert_usage_metadata(gemini_response.get("usageMetadata"))
 
-    # 构建 OpenAI 流式响应
-    response_data = {
-        "id": response_id,
-        "object": "chat.completion.chunk",
-        "created": int(time.time()),
-        "model": model,
-        "choices": choices,
-    }
+    # 构建 OpenAI 流式响应：id/object/created/model 在同一流中不变，使用调用方预先构建的前缀，
+    # 每个 chunk 只序列化 choices（及 usage）
+    if chunk_prefix is None:
+        chunk_prefix = build_openai_stream_chunk_prefix(response_id, model)
+    body = chunk_prefix + json_dumps_bytes(choices)
 
     # 只在有 usage 数据且有 finish_reason 时添加 usage
     if usage:
         has_finish_reason = any(choice.get("finish_reason") for choice in choices)
         if has_finish_reason:
-            response_data["usage"] = usage
+            body += b',"usage":' + json_dumps_bytes(usage)
 
-    # 转换为 SSE 格式: "data: {json}\n\n"
-    return f"data: {json.dumps(response_data)}\n\n"
+    # 转换为 SSE 格式: "data: {json}\n\n"（直接拼接 bytes，省去 str 中转与再次编码）
+    return b"data: " + body + b"}\n\n"
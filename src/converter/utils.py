@@ -19,18 +19,18 @@ def extract_content_and_reasoning(parts: list) -> tuple:
               }
           }
     """
-    content = ""
-    reasoning_content = ""
+    content_parts = []
+    reasoning_parts = []
     images = []
 
     for part in parts:
-        # 提取文本内容
+        # 提取文本内容（先收集片段，最后统一 join）
         text = part.get("text", "")
         if text:
             if part.get("thought", False):
-                reasoning_content += text
+                reasoning_parts.append(text)
             else:
-                content += text
+                content_parts.append(text)
 
         # 提取图片数据
         if "inlineData" in part:
@@ -44,7 +44,7 @@ def extract_content_and_reasoning(parts: list) -> tuple:
                 }
             })
 
-    return content, reasoning_content, images
+    return "".join(content_parts), "".join(reasoning_parts), images
 
 
 async def merge_system_messages(request_body: Dict[str, Any]) -> Dict[str, Any]:
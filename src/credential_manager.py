@@ -3,6 +3,7 @@
 """
 
 import asyncio
+import inspect
 import time
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Tuple
@@ -484,14 +485,21 @@ class _CredentialManagerSingleton:
 
     def __init__(self):
         self._manager = None
+        self._lock = asyncio.Lock()
 
     async def _get_or_create(self) -> CredentialManager:
-        """获取或创建单例实例（线程安全）"""
-        if self._instance is None:
-            # 简单的实例创建（异步环境下一般不需要复杂的锁）
+        """获取或创建单例实例（协程安全）"""
+        # 快速路径：已初始化时无需加锁
+        if self._instance is not None:
+            return self._instance
+
+        # 双重检查加锁：initialize() 期间会让出事件循环，
+        # 并发的首批请求只允许一个执行初始化，其余等待复用同一实例
+        async with self._lock:
             if self._instance is None:
-                self._instance = CredentialManager()
-                await self._instance.initialize()
+                instance = CredentialManager()
+                await instance.initialize()
+                self._instance = instance
                 log.debug("CredentialManager singleton initialized")
 
         return self._instance
@@ -503,6 +511,11 @@ class _CredentialManagerSingleton:
             method = getattr(manager, name)
             return await method(*args, **kwargs)
 
+        # 仅缓存 CredentialManager 上真实定义的协程方法：之后同名访问直接命中实例字典，
+        # 不再走 __getattr__ 重新创建闭包（包装器每次调用仍经 _get_or_create 取实例，不影响懒加载语义）；
+        # 拼写错误或 hasattr/getattr 探测的名称不写入缓存，避免之后永久变成"存在"
+        if inspect.iscoroutinefunction(getattr(CredentialManager, name, None)):
+            setattr(self, name, _async_wrapper)
         return _async_wrapper
 
 
@@ -4,6 +4,7 @@
 保持通用性，不与特定业务逻辑耦合
 """
 
+import importlib.util
 from contextlib import asynccontextmanager
 from typing import Any, AsyncGenerator, Dict, Optional
 
@@ -11,11 +12,56 @@ import httpx
 
 from config import get_proxy_config
 from log import log
+from src.utils import json_dumps_bytes
+
+# 可选：安装 httpx-aiohttp 后，无代理时共享客户端改用 aiohttp 传输层（高并发流式场景调度开销更低），
+# 接口仍为 httpx；未安装时使用 httpx 默认传输层
+try:
+    import aiohttp
+    from httpx_aiohttp import AiohttpTransport
+except ImportError:
+    aiohttp = None
+    AiohttpTransport = None
+
+# 可选：安装 h2（httpx[http2]）后，httpx 传输层通过 ALPN 协商 HTTP/2，
+# 同一主机的并发请求复用一条 TCP/TLS 连接；服务端不支持时自动回退到 HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+# 共享连接池配置：流式响应会长时间占用连接，不限制总连接数，避免并发流超过上限后在连接池中排队；
+# 空闲连接保留 60 秒，覆盖客户端连续对话之间的间隔，减少重新握手
+SHARED_CLIENT_LIMITS = httpx.Limits(
+    max_connections=None,
+    max_keepalive_connections=100,
+    keepalive_expiry=60.0,
+)
+
+
+def _create_aiohttp_transport() -> httpx.AsyncBaseTransport:
+    """
+    创建 aiohttp 传输层，连接池参数与 SHARED_CLIENT_LIMITS 保持一致（limit=0 表示不限制总连接数）
+
+    trust_env=True：与 httpx 默认行为一致，继续读取 HTTP(S)_PROXY / NO_PROXY 环境变量
+    （aiohttp 默认不读取，否则依赖环境变量代理的部署会静默直连）
+    """
+    return AiohttpTransport(
+        client=lambda: aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=0,
+                keepalive_timeout=SHARED_CLIENT_LIMITS.keepalive_expiry,
+            ),
+            trust_env=True,
+        )
+    )
 
 
 class HttpxClientManager:
     """通用HTTP客户端管理器"""
 
+    def __init__(self):
+        # 按代理配置缓存的共享客户端，复用连接池以避免每次请求重新建立 TCP/TLS 连接
+        self._shared_clients: Dict[Optional[str], httpx.AsyncClient] = {}
+
     async def get_client_kwargs(self, timeout: float = 30.0, **kwargs) -> Dict[str, Any]:
         """获取httpx客户端的通用配置参数"""
         client_kwargs = {"timeout": timeout, **kwargs}
@@ -55,6 +101,42 @@ class HttpxClientManager:
             except Exception as e:
                 log.warning(f"Error closing streaming client: {e}")
 
+    async def get_shared_client(self) -> httpx.AsyncClient:
+        """
+        获取共享的异步HTTP客户端（连接池跨请求复用）
+
+        超时需在每次请求时单独传入；代理配置变更后会创建新的客户端，
+        旧客户端保留至关闭，以免中断仍在进行中的流式请求
+        """
+        current_proxy_config = await get_proxy_config() or None
+
+        client = self._shared_clients.get(current_proxy_config)
+        if client is None or client.is_closed:
+            client_kwargs = {
+                "limits": SHARED_CLIENT_LIMITS,
+            }
+            if current_proxy_config:
+                client_kwargs["proxy"] = current_proxy_config
+            elif AiohttpTransport is not None:
+                # aiohttp 传输层不支持 SOCKS 代理，仅在直连时启用
+                client_kwargs["transport"] = _create_aiohttp_transport()
+            if HTTP2_AVAILABLE and "transport" not in client_kwargs:
+                client_kwargs["http2"] = True
+            client = httpx.AsyncClient(**client_kwargs)
+            self._shared_clients[current_proxy_config] = client
+
+        return client
+
+    async def close(self) -> None:
+        """关闭所有共享客户端，在服务停止时调用"""
+        clients = list(self._shared_clients.values())
+        self._shared_clients.clear()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                log.warning(f"Error closing shared client: {e}")
+
 
 # 全局HTTP客户端管理器实例
 http_client = HttpxClientManager()
@@ -65,8 +147,29 @@ async def get_async(
     url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 30.0, **kwargs
 ) -> httpx.Response:
     """通用异步GET请求"""
-    async with http_client.get_client(timeout=timeout, **kwargs) as client:
-        return await client.get(url, headers=headers)
+    if kwargs:
+        async with http_client.get_client(timeout=timeout, **kwargs) as client:
+            return await client.get(url, headers=headers)
+
+    client = await http_client.get_shared_client()
+    return await client.get(url, headers=headers, timeout=timeout)
+
+
+# 流式请求出错时读取的错误响应体上限（上游错误信封通常不足 1KB）
+_ERROR_BODY_MAX_BYTES = 64 * 1024
+
+
+def _encode_json_body(
+    body: Any, headers: Optional[Dict[str, str]]
+) -> tuple[bytes, Dict[str, str]]:
+    """
+    用 orjson 将 JSON 请求体序列化为 bytes（替代 httpx 内部的标准库 json.dumps），
+    并补充 Content-Type 请求头
+    """
+    request_headers = dict(headers) if headers else {}
+    if not any(key.lower() == "content-type" for key in request_headers):
+        request_headers["Content-Type"] = "application/json"
+    return json_dumps_bytes(body), request_headers
 
 
 async def post_async(
@@ -78,8 +181,19 @@ async def post_async(
     **kwargs,
 ) -> httpx.Response:
     """通用异步POST请求"""
-    async with http_client.get_client(timeout=timeout, **kwargs) as client:
-        return await client.post(url, data=data, json=json, headers=headers)
+    content = None
+    if json is not None:
+        content, headers = _encode_json_body(json, headers)
+        json = None
+
+    if kwargs:
+        async with http_client.get_client(timeout=timeout, **kwargs) as client:
+            return await client.post(url, content=content, data=data, json=json, headers=headers)
+
+    client = await http_client.get_shared_client()
+    return await client.post(
+        url, content=content, data=data, json=json, headers=headers, timeout=timeout
+    )
 
 
 async def stream_post_async(
@@ -90,19 +204,58 @@ async def stream_post_async(
     **kwargs,
 ):
     """流式异步POST请求"""
-    async with http_client.get_streaming_client(**kwargs) as client:
-        async with client.stream("POST", url, json=body, headers=headers) as r:
-            # 错误直接返回
-            if r.status_code != 200:
-                from fastapi import Response
-                yield Response(await r.aread(), r.status_code, dict(r.headers))
-                return
-
-            # 如果native=True，直接返回bytes流
-            if native:
-                async for chunk in r.aiter_bytes():
-                    yield chunk
-            else:
-                # 通过aiter_lines转化成str流返回
-                async for line in r.aiter_lines():
+    # 流式请求默认无超时限制
+    timeout = kwargs.pop("timeout", None)
+    if kwargs:
+        async with http_client.get_streaming_client(timeout=timeout, **kwargs) as client:
+            async for item in _stream_post(client, url, body, native, headers, timeout):
+                yield item
+        return
+
+    client = await http_client.get_shared_client()
+    async for item in _stream_post(client, url, body, native, headers, timeout):
+        yield item
+
+
+async def _stream_post(
+    client: httpx.AsyncClient,
+    url: str,
+    body: Dict[str, Any],
+    native: bool,
+    headers: Optional[Dict[str, str]],
+    timeout: Optional[float],
+):
+    """在给定客户端上发起流式POST，仅关闭本次响应，连接归还连接池"""
+    content, headers = _encode_json_body(body, headers)
+    async with client.stream("POST", url, content=content, headers=headers, timeout=timeout) as r:
+        # 错误直接返回
+        if r.status_code != 200:
+            from fastapi import Response
+
+            # 错误响应只读取前 _ERROR_BODY_MAX_BYTES 字节（足够日志与冷却时间解析），
+            # 避免异常大的错误体被整体读入内存
+            error_body = bytearray()
+            async for chunk in r.aiter_bytes():
+                error_body += chunk
+                if len(error_body) >= _ERROR_BODY_MAX_BYTES:
+                    del error_body[_ERROR_BODY_MAX_BYTES:]
+                    break
+
+            # 内容已解压且可能被截断，移除原始的长度与压缩相关的header
+            error_headers = dict(r.headers)
+            error_headers.pop('content-encoding', None)
+            error_headers.pop('content-length', None)
+            yield Response(bytes(error_body), r.status_code, error_headers)
+            return
+
+        # 如果native=True，直接返回bytes流
+        if native:
+            async for chunk in r.aiter_bytes():
+                yield chunk
+        else:
+            # 通过aiter_lines转化成str流返回
+            # SSE 事件间的空行只是分隔符，下游各层按行解析且都会跳过空行，这里直接丢弃，
+            # 使每个事件少经过一轮逐层的异步生成器调度
+            async for line in r.aiter_lines():
+                if line:
                     yield line
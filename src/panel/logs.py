@@ -12,7 +12,7 @@ from starlette.websockets import WebSocketState
 
 import config
 from log import log
-from src.utils import verify_panel_token
+from src.utils import secret_equals, verify_panel_token
 from .utils import ConnectionManager
 
 
@@ -108,7 +108,7 @@ async def websocket_logs(websocket: WebSocket):
     # 验证 token
     try:
         panel_password = await config.get_panel_password()
-        if token != panel_password:
+        if not secret_equals(token, panel_password):
             await websocket.close(code=403, reason="Invalid authentication token")
             log.warning("WebSocket连接被拒绝: token验证失败")
             return
@@ -11,14 +11,17 @@ project_root = Path(__file__).resolve().parent.parent.parent.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
+# 标准库
+from typing import Any, Callable, Dict, List, Tuple
+
 # 第三方库
-from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Response
 
 # 本地模块 - 工具和认证
 from src.utils import (
     get_base_model_from_feature_model,
-    authenticate_flexible
+    authenticate_flexible,
+    json_dumps_bytes,
 )
 
 # 本地模块 - API
@@ -26,7 +29,6 @@ from src.api.antigravity import fetch_available_models
 
 # 本地模块 - 基础路由工具
 from src.router.base_router import create_gemini_model_list, create_openai_model_list
-from src.models import model_to_dict
 from log import log
 
 
@@ -34,6 +36,10 @@ from log import log
 
 router = APIRouter()
 
+# 按格式缓存已序列化的模型列表响应体：(模型 ID 元组, JSON bytes)
+# 上游模型列表已在 API 层按 TTL 缓存，列表未变化时直接复用 bytes，省去逐模型构建字典与序列化
+_rendered_model_lists: Dict[str, Tuple[Tuple[str, ...], bytes]] = {}
+
 
 # ==================== 辅助函数 ====================
 
@@ -70,6 +76,27 @@ async def get_antigravity_models_with_features():
     return models
 
 
+def _cached_model_list_response(
+    list_format: str,
+    models: List[str],
+    build: Callable[[], Dict[str, Any]]
+) -> Response:
+    """
+    返回模型列表响应，模型 ID 与上次相同时复用已序列化的 bytes
+
+    Args:
+        list_format: 列表格式（"gemini" 或 "openai"），作为缓存键
+        models: 带功能前缀的模型 ID 列表
+        build: 构建响应字典的函数，仅在缓存未命中时调用
+    """
+    key = tuple(models)
+    cached = _rendered_model_lists.get(list_format)
+    if cached is None or cached[0] != key:
+        cached = (key, json_dumps_bytes(build()))
+        _rendered_model_lists[list_format] = cached
+    return Response(content=cached[1], media_type="application/json")
+
+
 # ==================== API 路由 ====================
 
 @router.get("/antigravity/v1beta/models")
@@ -82,7 +109,7 @@ async def list_gemini_models(token: str = Depends(authenticate_flexible)):
     """
     models = await get_antigravity_models_with_features()
     log.info("[ANTIGRAVITY MODEL LIST] 返回 Gemini 格式")
-    return JSONResponse(content=create_gemini_model_list(
+    return _cached_model_list_response("gemini", models, lambda: create_gemini_model_list(
         models,
         base_name_extractor=get_base_model_from_feature_model
     ))
@@ -98,8 +125,6 @@ async def list_openai_models(token: str = Depends(authenticate_flexible)):
     """
     models = await get_antigravity_models_with_features()
     log.info("[ANTIGRAVITY MODEL LIST] 返回 OpenAI 格式")
-    model_list = create_openai_model_list(models, owned_by="google")
-    return JSONResponse(content={
-        "object": "list",
-        "data": [model_to_dict(model) for model in model_list.data]
-    })
+    return _cached_model_list_response(
+        "openai", models, lambda: create_openai_model_list(models, owned_by="google")
+    )
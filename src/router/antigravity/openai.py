@@ -16,8 +16,8 @@ import asyncio
 import json
 
 # 第三方库
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 
 # 本地模块 - 配置和日志
 from config import get_anti_truncation_max_attempts
@@ -29,6 +29,10 @@ from src.utils import (
     is_anti_truncation_model,
     is_fake_streaming_model,
     authenticate_bearer,
+    FastJSONResponse,
+    json_dumps_bytes,
+    json_loads,
+    FastJSONRoute,
 )
 
 # 本地模块 - 转换器（假流式需要）
@@ -39,7 +43,7 @@ from src.converter.fake_stream import (
 )
 
 # 本地模块 - 基础路由工具
-from src.router.hi_check import is_health_check_request, create_health_check_response
+from src.router.hi_check import is_health_check_model_request, create_health_check_response_bytes
 
 # 本地模块 - 数据模型
 from src.models import OpenAIChatCompletionRequest, model_to_dict
@@ -50,7 +54,10 @@ from src.task_manager import create_managed_task
 
 # ==================== 路由器初始化 ====================
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
+
+# 流结束标记，预先编码为 bytes
+_SSE_DONE = b"data: [DONE]\n\n"
 
 
 # ==================== API 路由 ====================
@@ -69,14 +76,16 @@ async def chat_completions(
     """
     log.debug(f"[ANTIGRAVITY-OPENAI] Request for model: {openai_request.model}")
 
+    # 健康检查（直接检查模型属性，命中时省去整个请求的 model_to_dict 转换）
+    if is_health_check_model_request(openai_request):
+        return Response(
+            content=create_health_check_response_bytes(format="openai"),
+            media_type="application/json",
+        )
+
     # 转换为字典
     normalized_dict = model_to_dict(openai_request)
 
-    # 健康检查
-    if is_health_check_request(normalized_dict, format="openai"):
-        response = create_health_check_response(format="openai")
-        return JSONResponse(content=response)
-
     # 处理模型名称和功能检测
     use_fake_streaming = is_fake_streaming_model(openai_request.model)
     use_anti_truncation = is_anti_truncation_model(openai_request.model)
@@ -118,16 +127,16 @@ async def chat_completions(
         # 检查响应状态码
         status_code = getattr(response, "status_code", 200)
 
-        # 提取响应体
+        # 提取响应体（bytes 直接交给 json_loads 解析，省去先 decode 成 str 的整份拷贝）
         if hasattr(response, "body"):
-            response_body = response.body.decode() if isinstance(response.body, bytes) else response.body
+            response_body = response.body
         elif hasattr(response, "content"):
-            response_body = response.content.decode() if isinstance(response.content, bytes) else response.content
+            response_body = response.content
         else:
             response_body = str(response)
 
         try:
-            gemini_response = json.loads(response_body)
+            gemini_response = json_loads(response_body)
         except Exception as e:
             log.error(f"Failed to parse Gemini response: {e}")
             raise HTTPException(status_code=500, detail="Response parsing failed")
@@ -140,7 +149,7 @@ async def chat_completions(
             status_code
         )
 
-        return JSONResponse(content=openai_response, status_code=status_code)
+        return FastJSONResponse(content=openai_response, status_code=status_code)
 
     # ========== 流式请求 ==========
 
@@ -210,19 +219,19 @@ async def chat_completions(
             except Exception:
                 # 如果无法解析为JSON，包装成错误对象
                 yield f"data: {json.dumps({'error': {'code': response.status_code, 'message': error_body or 'upstream error', 'status': 'ERROR'}})}\n\n".encode()
-            yield "data: [DONE]\n\n".encode()
+            yield _SSE_DONE
             return
 
         # 处理成功响应 - 提取响应内容
         if hasattr(response, "body"):
-            response_body = response.body.decode() if isinstance(response.body, bytes) else response.body
+            response_body = response.body
         elif hasattr(response, "content"):
-            response_body = response.content.decode() if isinstance(response.content, bytes) else response.content
+            response_body = response.content
         else:
             response_body = str(response)
 
         try:
-            gemini_response = json.loads(response_body)
+            gemini_response = json_loads(response_body)
             log.debug(f"OpenAI fake stream Gemini response: {gemini_response}")
 
             # 检查是否是错误响应（有些错误可能status_code是200但包含error字段）
@@ -236,7 +245,7 @@ async def chat_completions(
                     200
                 )
                 yield f"data: {json.dumps(openai_error)}\n\n".encode()
-                yield "data: [DONE]\n\n".encode()
+                yield _SSE_DONE
                 return
 
             # 使用统一的解析函数
@@ -249,9 +258,10 @@ async def chat_completions(
             # 构建响应块
             chunks = build_openai_fake_stream_chunks(content, reasoning_content, finish_reason, real_model, images)
             for idx, chunk in enumerate(chunks):
-                chunk_json = json.dumps(chunk)
-                log.debug(f"[FAKE_STREAM] Yielding chunk #{idx+1}: {chunk_json[:200]}")
-                yield f"data: {chunk_json}\n\n".encode()
+                chunk_json = json_dumps_bytes(chunk)
+                if log.is_enabled("debug"):
+                    log.debug(f"[FAKE_STREAM] Yielding chunk #{idx+1}: {chunk_json[:200].decode('utf-8', errors='replace')}")
+                yield b"data: " + chunk_json + b"\n\n"
 
         except Exception as e:
             log.error(f"Response parsing failed: {e}, directly yield error")
@@ -269,7 +279,7 @@ async def chat_completions(
             }
             yield f"data: {json.dumps(error_chunk)}\n\n".encode()
 
-        yield "data: [DONE]\n\n".encode()
+        yield _SSE_DONE
 
     # ========== 流式抗截断生成器 ==========
     async def anti_truncation_generator():
@@ -298,44 +308,43 @@ async def chat_completions(
         # 转换为 OpenAI 格式
         import uuid
         response_id = str(uuid.uuid4())
+        # id/object/created/model 在整个流中不变，预序列化前缀只在流开始时构建一次
+        from src.converter.openai2gemini import build_openai_stream_chunk_prefix
+        chunk_prefix = build_openai_stream_chunk_prefix(response_id, real_model)
 
         # 直接迭代 process_stream() 生成器，并转换为 OpenAI 格式
         async for chunk in processor.process_stream():
             if not chunk:
                 continue
 
-            # 解析 Gemini SSE 格式
-            chunk_str = chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
-
-            # 跳过空行
-            if not chunk_str.strip():
-                continue
-
-            # 处理 [DONE] 标记
-            if chunk_str.strip() == "data: [DONE]":
-                yield "data: [DONE]\n\n".encode('utf-8')
-                return
+            # 只处理 "data: {...}" 格式（空行与其它行跳过）；str / bytes 按原类型判断，
+            # convert_gemini_to_openai_stream 两者都接受，无需先 decode 成 str
+            is_bytes = isinstance(chunk, bytes)
+            if chunk.startswith(b"data: " if is_bytes else "data: "):
+                # 处理 [DONE] 标记
+                if chunk[6:].startswith(b"[DONE]" if is_bytes else "[DONE]"):
+                    yield _SSE_DONE
+                    return
 
-            # 解析 "data: {...}" 格式
-            if chunk_str.startswith("data: "):
                 try:
                     # 转换为 OpenAI 格式
                     from src.converter.openai2gemini import convert_gemini_to_openai_stream
-                    openai_chunk_str = convert_gemini_to_openai_stream(
-                        chunk_str,
+                    openai_chunk = convert_gemini_to_openai_stream(
+                        chunk,
                         real_model,
-                        response_id
+                        response_id,
+                        chunk_prefix=chunk_prefix,
                     )
 
-                    if openai_chunk_str:
-                        yield openai_chunk_str.encode('utf-8')
+                    if openai_chunk:
+                        yield openai_chunk
 
                 except Exception as e:
                     log.error(f"Failed to convert chunk: {e}")
                     continue
 
         # 发送结束标记
-        yield "data: [DONE]\n\n".encode('utf-8')
+        yield _SSE_DONE
 
     # ========== 普通流式生成器 ==========
     async def normal_stream_generator():
@@ -347,6 +356,9 @@ async def chat_completions(
         stream_gen = stream_request(body=api_request, native=False)
 
         response_id = str(uuid.uuid4())
+        # id/object/created/model 在整个流中不变，预序列化前缀只在流开始时构建一次
+        from src.converter.openai2gemini import build_openai_stream_chunk_prefix
+        chunk_prefix = build_openai_stream_chunk_prefix(response_id, real_model)
 
         # yield所有数据,处理可能的错误Response
         async for chunk in stream_gen:
@@ -366,41 +378,37 @@ async def chat_completions(
                     yield f"data: {json.dumps(openai_error)}\n\n".encode('utf-8')
                 except Exception:
                     yield f"data: {json.dumps({'error': 'Stream error'})}\n\n".encode('utf-8')
-                yield b"data: [DONE]\n\n"
+                yield _SSE_DONE
                 return
             else:
-                # 正常的bytes数据，转换为 OpenAI 格式
-                chunk_str = chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
-
-                # 跳过空行
-                if not chunk_str.strip():
-                    continue
-
-                # 处理 [DONE] 标记
-                if chunk_str.strip() == "data: [DONE]":
-                    yield "data: [DONE]\n\n".encode('utf-8')
-                    return
+                # 正常数据，只处理 "data: {...}" 行（空行与其它行跳过）；str / bytes 按原类型判断，
+                # convert_gemini_to_openai_stream 两者都接受，无需先 decode 成 str
+                is_bytes = isinstance(chunk, bytes)
+                if chunk.startswith(b"data: " if is_bytes else "data: "):
+                    # 处理 [DONE] 标记
+                    if chunk[6:].startswith(b"[DONE]" if is_bytes else "[DONE]"):
+                        yield _SSE_DONE
+                        return
 
-                # 解析并转换 Gemini chunk 为 OpenAI 格式
-                if chunk_str.startswith("data: "):
                     try:
                         # 转换为 OpenAI 格式
                         from src.converter.openai2gemini import convert_gemini_to_openai_stream
-                        openai_chunk_str = convert_gemini_to_openai_stream(
-                            chunk_str,
+                        openai_chunk = convert_gemini_to_openai_stream(
+                            chunk,
                             real_model,
-                            response_id
+                            response_id,
+                            chunk_prefix=chunk_prefix,
                         )
 
-                        if openai_chunk_str:
-                            yield openai_chunk_str.encode('utf-8')
+                        if openai_chunk:
+                            yield openai_chunk
 
                     except Exception as e:
                         log.error(f"Failed to convert chunk: {e}")
                         continue
 
         # 发送结束标记
-        yield "data: [DONE]\n\n".encode('utf-8')
+        yield _SSE_DONE
 
     # ========== 根据模式选择生成器 ==========
     if use_fake_streaming:
@@ -3,38 +3,45 @@ Base Router - 共用的路由基础功能
 提供模型列表处理、通用响应等共同功能
 """
 
-from typing import List
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Union
+
+from fastapi import Response
+
+from log import log
+from src.converter.anthropic2gemini import gemini_to_anthropic_response
+from src.utils import json_dumps_bytes, json_loads
 
-from src.models import Model, ModelList
 
 def create_openai_model_list(
     model_ids: List[str],
     owned_by: str = "google"
-) -> ModelList:
+) -> Dict[str, Any]:
     """
     创建OpenAI格式的模型列表
+
+    直接构造与 Model/ModelList 序列化结果相同的字典，省去逐个模型的 Pydantic 校验与转换
     
     Args:
         model_ids: 模型ID列表
         owned_by: 模型所有者
         
     Returns:
-        ModelList对象
+        包含模型列表的字典
     """
-    from datetime import datetime, timezone
     current_timestamp = int(datetime.now(timezone.utc).timestamp())
     
     models = [
-        Model(
-            id=model_id,
-            object='model',
-            created=current_timestamp,
-            owned_by=owned_by
-        )
+        {
+            "id": model_id,
+            "object": "model",
+            "created": current_timestamp,
+            "owned_by": owned_by,
+        }
         for model_id in model_ids
     ]
     
-    return ModelList(data=models)
+    return {"object": "list", "data": models}
 
 
 def create_gemini_model_list(
@@ -71,4 +78,92 @@ def create_gemini_model_list(
         }
         gemini_models.append(model_info)
     
-    return {"models": gemini_models}
\ No newline at end of file
+    return {"models": gemini_models}
+
+
+def unwrap_sse_chunk(chunk: Any, log_tag: str) -> Any:
+    """
+    展开 SSE 数据块中的 response 包装层，返回应发送给客户端的数据块
+
+    非 SSE 行、[DONE] 标记、不含包装层或无法解析的数据块原样返回
+    """
+    if not isinstance(chunk, (str, bytes)):
+        return chunk
+
+    # str / bytes 直接按原类型判断与切片，不先 decode 成 str
+    is_bytes = isinstance(chunk, bytes)
+    if not chunk.startswith(b"data: " if is_bytes else "data: "):
+        return chunk
+
+    # JSON 解析容忍首尾空白，无需 strip() 复制一份
+    json_str = chunk[6:]
+
+    # 不含 "response" 字样时必然没有包装层（[DONE] 也在此返回），无需解析再序列化
+    if (b'"response"' if is_bytes else '"response"') not in json_str:
+        return chunk
+
+    try:
+        data = json_loads(json_str)
+    except ValueError:
+        # JSON解析失败，直接返回原始chunk
+        return chunk
+
+    if "response" in data and "candidates" not in data:
+        log.debug(f"[{log_tag}] 展开response包装")
+        # 重新构建SSE格式（直接拼接 bytes）
+        return b"data: " + json_dumps_bytes(data["response"]) + b"\n\n"
+
+    # 已经是展开的格式，直接返回
+    return chunk
+
+
+def sse_data(data: Any) -> bytes:
+    """生成 SSE data 帧（orjson 可用时直接序列化为 bytes）"""
+    return b"data: " + json_dumps_bytes(data) + b"\n\n"
+
+
+def extract_response_body(response: Any) -> Union[bytes, str]:
+    """
+    提取上游响应体，供 json_loads 直接解析
+
+    json_loads 可直接接受 bytes，这里不再先 decode 成 str，省去一次整段拷贝
+    """
+    if hasattr(response, "body"):
+        return response.body
+    if hasattr(response, "content"):
+        return response.content
+    return str(response)
+
+
+async def anthropic_error_chunk_wrapper(stream_gen: AsyncIterator[Any], real_model: str) -> AsyncIterator[bytes]:
+    """包装上游流式生成器：统一为 bytes，并将错误 Response 转换为 Anthropic 错误事件"""
+    async for chunk in stream_gen:
+        # 检查是否是Response对象（错误情况）
+        if isinstance(chunk, Response):
+            # 错误响应，不进行转换，直接传递
+            try:
+                error_content = chunk.body if isinstance(chunk.body, bytes) else (chunk.body or b'').encode('utf-8')
+                gemini_error = json_loads(error_content)
+                anthropic_error = gemini_to_anthropic_response(
+                    gemini_error,
+                    real_model,
+                    chunk.status_code
+                )
+                yield sse_data(anthropic_error)
+            except Exception:
+                yield sse_data({'type': 'error', 'error': {'type': 'api_error', 'message': 'Stream error'}})
+            yield b"data: [DONE]\n\n"
+            return
+        else:
+            # 确保是bytes类型
+            if isinstance(chunk, str):
+                yield chunk.encode('utf-8')
+            else:
+                yield chunk
+
+
+def summarize_thinking(thinking: Any) -> Any:
+    """提取 thinking 配置中用于日志的摘要字段；非 dict 时原样返回"""
+    if isinstance(thinking, dict):
+        return {"type": thinking.get("type"), "budget_tokens": thinking.get("budget_tokens")}
+    return thinking
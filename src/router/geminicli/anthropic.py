@@ -14,10 +14,11 @@ if str(project_root) not in sys.path:
 # 标准库
 import asyncio
 import json
+from typing import Any, AsyncIterator, Dict
 
 # 第三方库
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 
 # 本地模块 - 配置和日志
 from config import get_anti_truncation_max_attempts
@@ -29,8 +30,24 @@ from src.utils import (
     is_anti_truncation_model,
     is_fake_streaming_model,
     authenticate_bearer,
+    FastJSONResponse,
+    json_dumps_bytes,
+    json_loads,
+    FastJSONRoute,
 )
 
+# 本地模块 - API 层
+from src.api.geminicli import non_stream_request, stream_request
+
+# 本地模块 - 转换器
+from src.converter.anthropic2gemini import (
+    anthropic_to_gemini_request,
+    gemini_stream_to_anthropic_stream,
+    gemini_to_anthropic_response,
+)
+from src.converter.anti_truncation import AntiTruncationStreamProcessor, apply_anti_truncation
+from src.converter.gemini_fix import normalize_gemini_request
+
 # 本地模块 - 转换器（假流式需要）
 from src.converter.fake_stream import (
     parse_response_for_fake_stream,
@@ -39,7 +56,13 @@ from src.converter.fake_stream import (
 )
 
 # 本地模块 - 基础路由工具
-from src.router.hi_check import is_health_check_request, create_health_check_response
+from src.router.base_router import (
+    anthropic_error_chunk_wrapper,
+    extract_response_body,
+    sse_data,
+    summarize_thinking,
+)
+from src.router.hi_check import is_health_check_model_request, create_health_check_response_bytes
 
 # 本地模块 - 数据模型
 from src.models import ClaudeRequest, model_to_dict
@@ -53,7 +76,32 @@ from src.token_estimator import estimate_input_tokens
 
 # ==================== 路由器初始化 ====================
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
+
+
+# ==================== 辅助函数 ====================
+
+async def _normal_stream_generator(api_request: Dict[str, Any], real_model: str) -> AsyncIterator[bytes]:
+    """
+    普通流式生成器
+
+    定义在模块级并显式传参，避免每个请求重新创建闭包函数对象与 cell
+    """
+    # 调用 API 层的流式请求（不使用 native 模式）
+    stream_gen = stream_request(body=api_request, native=False)
+
+    # 使用转换器处理整个流
+    try:
+        async for anthropic_chunk in gemini_stream_to_anthropic_stream(
+            anthropic_error_chunk_wrapper(stream_gen, real_model),
+            real_model,
+            200
+        ):
+            if anthropic_chunk:
+                yield anthropic_chunk
+    finally:
+        # 客户端断开或提前结束时显式关闭上游流，及时将连接归还共享连接池，而不是等待 GC
+        await stream_gen.aclose()
 
 
 # ==================== API 路由 ====================
@@ -72,14 +120,16 @@ async def messages(
     """
     log.debug(f"[GEMINICLI-ANTHROPIC] Request for model: {claude_request.model}")
 
+    # 健康检查（直接检查模型属性，命中时省去整个请求的 model_to_dict 转换）
+    if is_health_check_model_request(claude_request):
+        return Response(
+            content=create_health_check_response_bytes(format="anthropic"),
+            media_type="application/json",
+        )
+
     # 转换为字典
     normalized_dict = model_to_dict(claude_request)
 
-    # 健康检查
-    if is_health_check_request(normalized_dict, format="anthropic"):
-        response = create_health_check_response(format="anthropic")
-        return JSONResponse(content=response)
-
     # 处理模型名称和功能检测
     use_fake_streaming = is_fake_streaming_model(claude_request.model)
     use_anti_truncation = is_anti_truncation_model(claude_request.model)
@@ -96,14 +146,12 @@ async def messages(
     normalized_dict["model"] = real_model
 
     # 转换为 Gemini 格式 (使用 converter)
-    from src.converter.anthropic2gemini import anthropic_to_gemini_request
     gemini_dict = await anthropic_to_gemini_request(normalized_dict)
 
     # anthropic_to_gemini_request 不包含 model 字段，需要手动添加
     gemini_dict["model"] = real_model
 
     # 规范化 Gemini 请求 (使用 geminicli 模式)
-    from src.converter.gemini_fix import normalize_gemini_request
     gemini_dict = await normalize_gemini_request(gemini_dict, mode="geminicli")
 
     # 准备API请求格式 - 提取model并将其他字段放入request中
@@ -115,35 +163,28 @@ async def messages(
     # ========== 非流式请求 ==========
     if not is_streaming:
         # 调用 API 层的非流式请求
-        from src.api.geminicli import non_stream_request
         response = await non_stream_request(body=api_request)
 
         # 检查响应状态码
         status_code = getattr(response, "status_code", 200)
 
         # 提取响应体
-        if hasattr(response, "body"):
-            response_body = response.body.decode() if isinstance(response.body, bytes) else response.body
-        elif hasattr(response, "content"):
-            response_body = response.content.decode() if isinstance(response.content, bytes) else response.content
-        else:
-            response_body = str(response)
+        response_body = extract_response_body(response)
 
         try:
-            gemini_response = json.loads(response_body)
+            gemini_response = json_loads(response_body)
         except Exception as e:
             log.error(f"Failed to parse Gemini response: {e}")
             raise HTTPException(status_code=500, detail="Response parsing failed")
 
         # 转换为 Anthropic 格式
-        from src.converter.anthropic2gemini import gemini_to_anthropic_response
         anthropic_response = gemini_to_anthropic_response(
             gemini_response,
             real_model,
             status_code
         )
 
-        return JSONResponse(content=anthropic_response, status_code=status_code)
+        return FastJSONResponse(content=anthropic_response, status_code=status_code)
 
     # ========== 流式请求 ==========
 
@@ -151,11 +192,10 @@ async def messages(
     async def fake_stream_generator():
         # 发送心跳
         heartbeat = create_anthropic_heartbeat_chunk()
-        yield f"data: {json.dumps(heartbeat)}\n\n".encode()
+        yield sse_data(heartbeat)
 
         # 异步发送实际请求
         async def get_response():
-            from src.api.geminicli import non_stream_request
             response = await non_stream_request(body=api_request)
             return response
 
@@ -167,7 +207,7 @@ async def messages(
             while not response_task.done():
                 await asyncio.sleep(3.0)
                 if not response_task.done():
-                    yield f"data: {json.dumps(heartbeat)}\n\n".encode()
+                    yield sse_data(heartbeat)
 
             # 获取响应结果
             response = await response_task
@@ -201,44 +241,38 @@ async def messages(
             error_body = raw or ""
 
             try:
-                error_data = json.loads(error_body)
+                error_data = json_loads(error_body)
                 # 转换错误为 Anthropic 格式
-                from src.converter.anthropic2gemini import gemini_to_anthropic_response
                 anthropic_error = gemini_to_anthropic_response(
                     error_data,
                     real_model,
                     response.status_code
                 )
-                yield f"data: {json.dumps(anthropic_error)}\n\n".encode()
+                yield sse_data(anthropic_error)
             except Exception:
                 # 如果无法解析为JSON，包装成错误对象
-                yield f"data: {json.dumps({'error': {'code': response.status_code, 'message': error_body or 'upstream error', 'status': 'ERROR'}})}\n\n".encode()
+                yield sse_data({'error': {'code': response.status_code, 'message': error_body or 'upstream error', 'status': 'ERROR'}})
             yield "data: [DONE]\n\n".encode()
             return
 
         # 处理成功响应 - 提取响应内容
-        if hasattr(response, "body"):
-            response_body = response.body.decode() if isinstance(response.body, bytes) else response.body
-        elif hasattr(response, "content"):
-            response_body = response.content.decode() if isinstance(response.content, bytes) else response.content
-        else:
-            response_body = str(response)
+        response_body = extract_response_body(response)
 
         try:
-            gemini_response = json.loads(response_body)
-            log.debug(f"Anthropic fake stream Gemini response: {gemini_response}")
+            gemini_response = json_loads(response_body)
+            if log.is_enabled("debug"):
+                log.debug(f"Anthropic fake stream Gemini response: {gemini_response}")
 
             # 检查是否是错误响应（有些错误可能status_code是200但包含error字段）
             if "error" in gemini_response:
                 log.error(f"Fake streaming got error in response body: {gemini_response['error']}")
                 # 转换错误为 Anthropic 格式
-                from src.converter.anthropic2gemini import gemini_to_anthropic_response
                 anthropic_error = gemini_to_anthropic_response(
                     gemini_response,
                     real_model,
                     200
                 )
-                yield f"data: {json.dumps(anthropic_error)}\n\n".encode()
+                yield sse_data(anthropic_error)
                 yield "data: [DONE]\n\n".encode()
                 return
 
@@ -252,9 +286,10 @@ async def messages(
             # 构建响应块
             chunks = build_anthropic_fake_stream_chunks(content, reasoning_content, finish_reason, real_model, images)
             for idx, chunk in enumerate(chunks):
-                chunk_json = json.dumps(chunk)
-                log.debug(f"[FAKE_STREAM] Yielding chunk #{idx+1}: {chunk_json[:200]}")
-                yield f"data: {chunk_json}\n\n".encode()
+                chunk_bytes = json_dumps_bytes(chunk)
+                if log.is_enabled("debug"):
+                    log.debug(f"[FAKE_STREAM] Yielding chunk #{idx+1}: {chunk_bytes[:200].decode('utf-8', errors='ignore')}")
+                yield b"data: " + chunk_bytes + b"\n\n"
 
         except Exception as e:
             log.error(f"Response parsing failed: {e}, directly yield error")
@@ -266,17 +301,12 @@ async def messages(
                     "message": str(e)
                 }
             }
-            yield f"data: {json.dumps(error_chunk)}\n\n".encode()
+            yield sse_data(error_chunk)
 
         yield "data: [DONE]\n\n".encode()
 
     # ========== 流式抗截断生成器 ==========
     async def anti_truncation_generator():
-        from src.converter.anti_truncation import AntiTruncationStreamProcessor
-        from src.api.geminicli import stream_request
-        from src.converter.anti_truncation import apply_anti_truncation
-        from src.converter.anthropic2gemini import gemini_stream_to_anthropic_stream
-
         max_attempts = await get_anti_truncation_max_attempts()
 
         # 首先对payload应用反截断指令
@@ -312,51 +342,6 @@ async def messages(
             if anthropic_chunk:
                 yield anthropic_chunk
 
-    # ========== 普通流式生成器 ==========
-    async def normal_stream_generator():
-        from src.api.geminicli import stream_request
-        from fastapi import Response
-        from src.converter.anthropic2gemini import gemini_stream_to_anthropic_stream
-
-        # 调用 API 层的流式请求（不使用 native 模式）
-        stream_gen = stream_request(body=api_request, native=False)
-
-        # 包装流式生成器以处理错误响应
-        async def gemini_chunk_wrapper():
-            async for chunk in stream_gen:
-                # 检查是否是Response对象（错误情况）
-                if isinstance(chunk, Response):
-                    # 错误响应，不进行转换，直接传递
-                    try:
-                        error_content = chunk.body if isinstance(chunk.body, bytes) else (chunk.body or b'').encode('utf-8')
-                        gemini_error = json.loads(error_content.decode('utf-8'))
-                        from src.converter.anthropic2gemini import gemini_to_anthropic_response
-                        anthropic_error = gemini_to_anthropic_response(
-                            gemini_error,
-                            real_model,
-                            chunk.status_code
-                        )
-                        yield f"data: {json.dumps(anthropic_error)}\n\n".encode('utf-8')
-                    except Exception:
-                        yield f"data: {json.dumps({'type': 'error', 'error': {'type': 'api_error', 'message': 'Stream error'}})}\n\n".encode('utf-8')
-                    yield b"data: [DONE]\n\n"
-                    return
-                else:
-                    # 确保是bytes类型
-                    if isinstance(chunk, str):
-                        yield chunk.encode('utf-8')
-                    else:
-                        yield chunk
-
-        # 使用转换器处理整个流
-        async for anthropic_chunk in gemini_stream_to_anthropic_stream(
-            gemini_chunk_wrapper(),
-            real_model,
-            200
-        ):
-            if anthropic_chunk:
-                yield anthropic_chunk
-
     # ========== 根据模式选择生成器 ==========
     if use_fake_streaming:
         return StreamingResponse(fake_stream_generator(), media_type="text/event-stream")
@@ -364,7 +349,7 @@ async def messages(
         log.info("启用流式抗截断功能")
         return StreamingResponse(anti_truncation_generator(), media_type="text/event-stream")
     else:
-        return StreamingResponse(normal_stream_generator(), media_type="text/event-stream")
+        return StreamingResponse(_normal_stream_generator(api_request, real_model), media_type="text/event-stream")
 
 
 @router.post("/v1/messages/count_tokens")
@@ -380,53 +365,45 @@ async def count_tokens(
         _token: Bearer认证令牌（由Depends验证）
     
     Returns:
-        JSONResponse: 包含input_tokens的响应
+        FastJSONResponse: 包含input_tokens的响应
     """
     try:
-        payload = await request.json()
+        payload = json_loads(await request.body())
     except Exception as e:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=400,
             content={"type": "error", "error": {"type": "invalid_request_error", "message": f"JSON 解析失败: {str(e)}"}}
         )
 
     if not isinstance(payload, dict):
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=400,
             content={"type": "error", "error": {"type": "invalid_request_error", "message": "请求体必须为 JSON object"}}
         )
 
-    if not payload.get("model") or not isinstance(payload.get("messages"), list):
-        return JSONResponse(
+    # 必填字段只取一次，校验与后续日志共用；不构造模型，避免遍历复制整个 messages 列表
+    model = payload.get("model")
+    messages = payload.get("messages")
+    if not model or not isinstance(messages, list):
+        return FastJSONResponse(
             status_code=400,
             content={"type": "error", "error": {"type": "invalid_request_error", "message": "缺少必填字段：model / messages"}}
         )
 
-    try:
-        client_host = request.client.host if request.client else "unknown"
-        client_port = request.client.port if request.client else "unknown"
-    except Exception:
-        client_host = "unknown"
-        client_port = "unknown"
-
-    thinking_present = "thinking" in payload
-    thinking_value = payload.get("thinking")
-    thinking_summary = None
-    if thinking_present:
-        if isinstance(thinking_value, dict):
-            thinking_summary = {
-                "type": thinking_value.get("type"),
-                "budget_tokens": thinking_value.get("budget_tokens"),
-            }
-        else:
-            thinking_summary = thinking_value
+    # 请求摘要仅用于 info 日志，日志级别更高时跳过客户端信息与请求头的读取
+    if log.is_enabled("info"):
+        # 直接读取 ASGI scope，避免 request.client 属性每次重新构造 Address
+        client_host, client_port = request.scope.get("client") or ("unknown", "unknown")
 
-    user_agent = request.headers.get("user-agent", "")
-    log.info(
-        f"[GEMINICLI-ANTHROPIC] /messages/count_tokens 收到请求: client={client_host}:{client_port}, "
-        f"model={payload.get('model')}, messages={len(payload.get('messages') or [])}, "
-        f"thinking_present={thinking_present}, thinking={thinking_summary}, ua={user_agent}"
-    )
+        thinking_present = "thinking" in payload
+        thinking_summary = summarize_thinking(payload.get("thinking"))
+
+        user_agent = request.headers.get("user-agent", "")
+        log.info(
+            f"[GEMINICLI-ANTHROPIC] /messages/count_tokens 收到请求: client={client_host}:{client_port}, "
+            f"model={model}, messages={len(messages)}, "
+            f"thinking_present={thinking_present}, thinking={thinking_summary}, ua={user_agent}"
+        )
 
     # 简单估算
     input_tokens = 0
@@ -435,7 +412,7 @@ async def count_tokens(
     except Exception as e:
         log.error(f"[GEMINICLI-ANTHROPIC] token 估算失败: {e}")
 
-    return JSONResponse(content={"input_tokens": input_tokens})
+    return FastJSONResponse(content={"input_tokens": input_tokens})
 
 
 # ==================== 测试代码 ====================
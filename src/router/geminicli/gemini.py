@@ -16,8 +16,8 @@ import asyncio
 import json
 
 # 第三方库
-from fastapi import APIRouter, Depends, HTTPException, Path, Request
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Path, Request, Response
+from fastapi.responses import StreamingResponse
 
 # 本地模块 - 配置和日志
 from config import get_anti_truncation_max_attempts
@@ -28,7 +28,11 @@ from src.utils import (
     get_base_model_from_feature_model,
     is_anti_truncation_model,
     authenticate_gemini_flexible,
-    is_fake_streaming_model
+    is_fake_streaming_model,
+    json_dumps_bytes,
+    json_loads,
+    FastJSONResponse,
+    FastJSONRoute,
 )
 
 # 本地模块 - 转换器（假流式需要）
@@ -39,7 +43,8 @@ from src.converter.fake_stream import (
 )
 
 # 本地模块 - 基础路由工具
-from src.router.hi_check import is_health_check_request, create_health_check_response
+from src.router.hi_check import is_health_check_request, create_health_check_response_bytes
+from src.router.base_router import unwrap_sse_chunk
 
 # 本地模块 - 数据模型
 from src.models import GeminiRequest, model_to_dict
@@ -50,7 +55,7 @@ from src.task_manager import create_managed_task
 
 # ==================== 路由器初始化 ====================
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 
 # ==================== API 路由 ====================
@@ -77,8 +82,10 @@ async def generate_content(
 
     # 健康检查
     if is_health_check_request(normalized_dict, format="gemini"):
-        response = create_health_check_response(format="gemini")
-        return JSONResponse(content=response)
+        return Response(
+            content=create_health_check_response_bytes(format="gemini"),
+            media_type="application/json",
+        )
 
     # 处理模型名称和功能检测
     use_anti_truncation = is_anti_truncation_model(model)
@@ -108,12 +115,14 @@ async def generate_content(
     # 解包装响应：GeminiCli API 返回的格式有额外的 response 包装层
     # 需要提取 response.response 并返回标准 Gemini 格式
     try:
-        if response.status_code == 200:
-            response_data = json.loads(response.body if hasattr(response, 'body') else response.content)
-            # 如果有 response 包装，解包装它
+        body = response.body if hasattr(response, 'body') else response.content
+        # 不含 "response" 字样时必然没有包装层，跳过解析直接返回
+        if response.status_code == 200 and b'"response"' in body:
+            response_data = json_loads(body)
+            # 如果有 response 包装，解包装它（orjson 解析与序列化，减少这次往返的开销）
             if "response" in response_data:
                 unwrapped_data = response_data["response"]
-                return JSONResponse(content=unwrapped_data)
+                return FastJSONResponse(content=unwrapped_data)
         # 错误响应或没有 response 字段，直接返回
         return response
     except Exception as e:
@@ -161,7 +170,8 @@ async def stream_generate_content(
 
         # 发送心跳
         heartbeat = create_gemini_heartbeat_chunk()
-        yield f"data: {json.dumps(heartbeat)}\n\n".encode()
+        heartbeat_line = b"data: " + json_dumps_bytes(heartbeat) + b"\n\n"
+        yield heartbeat_line
 
         # 异步发送实际请求
         async def get_response():
@@ -177,7 +187,7 @@ async def stream_generate_content(
             while not response_task.done():
                 await asyncio.sleep(3.0)
                 if not response_task.done():
-                    yield f"data: {json.dumps(heartbeat)}\n\n".encode()
+                    yield heartbeat_line
 
             # 获取响应结果
             response = await response_task
@@ -221,16 +231,16 @@ async def stream_generate_content(
             yield "data: [DONE]\n\n".encode()
             return
 
-        # 处理成功响应 - 提取响应内容
+        # 处理成功响应 - 提取响应内容（bytes 直接交给 json_loads 解析，省去先 decode 成 str 的整份拷贝）
         if hasattr(response, "body"):
-            response_body = response.body.decode() if isinstance(response.body, bytes) else response.body
+            response_body = response.body
         elif hasattr(response, "content"):
-            response_body = response.content.decode() if isinstance(response.content, bytes) else response.content
+            response_body = response.content
         else:
             response_body = str(response)
 
         try:
-            response_data = json.loads(response_body)
+            response_data = json_loads(response_body)
             log.debug(f"Gemini fake stream response data: {response_data}")
 
             # 检查是否是错误响应（有些错误可能status_code是200但包含error字段）
@@ -250,14 +260,16 @@ async def stream_generate_content(
             # 构建响应块
             chunks = build_gemini_fake_stream_chunks(content, reasoning_content, finish_reason, images)
             for idx, chunk in enumerate(chunks):
-                chunk_json = json.dumps(chunk)
-                log.debug(f"[FAKE_STREAM] Yielding chunk #{idx+1}: {chunk_json[:200]}")
-                yield f"data: {chunk_json}\n\n".encode()
+                chunk_json = json_dumps_bytes(chunk)
+                if log.is_enabled("debug"):
+                    log.debug(f"[FAKE_STREAM] Yielding chunk #{idx+1}: {chunk_json[:200].decode('utf-8', errors='replace')}")
+                yield b"data: " + chunk_json + b"\n\n"
 
         except Exception as e:
             log.error(f"Response parsing failed: {e}, directly yield original response")
             # 直接yield原始响应,不进行包装
-            yield f"data: {response_body}\n\n".encode()
+            raw_body = response_body if isinstance(response_body, bytes) else str(response_body).encode()
+            yield b"data: " + raw_body + b"\n\n"
 
         yield "data: [DONE]\n\n".encode()
 
@@ -297,40 +309,7 @@ async def stream_generate_content(
 
         # 迭代 process_stream() 生成器，并展开 response 包装
         async for chunk in processor.process_stream():
-            if isinstance(chunk, (str, bytes)):
-                chunk_str = chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
-
-                # 解析并展开 response 包装
-                if chunk_str.startswith("data: "):
-                    json_str = chunk_str[6:].strip()
-
-                    # 跳过 [DONE] 标记
-                    if json_str == "[DONE]":
-                        yield chunk
-                        continue
-
-                    try:
-                        # 解析JSON
-                        data = json.loads(json_str)
-
-                        # 展开 response 包装
-                        if "response" in data and "candidates" not in data:
-                            log.debug(f"[GEMINICLI-ANTI-TRUNCATION] 展开response包装")
-                            unwrapped_data = data["response"]
-                            # 重新构建SSE格式
-                            yield f"data: {json.dumps(unwrapped_data, ensure_ascii=False)}\n\n".encode('utf-8')
-                        else:
-                            # 已经是展开的格式，直接返回
-                            yield chunk
-                    except json.JSONDecodeError:
-                        # JSON解析失败，直接返回原始chunk
-                        yield chunk
-                else:
-                    # 不是SSE格式，直接返回
-                    yield chunk
-            else:
-                # 其他类型，直接返回
-                yield chunk
+            yield unwrap_sse_chunk(chunk, "GEMINICLI-ANTI-TRUNCATION")
 
     # ========== 普通流式生成器 ==========
     async def normal_stream_generator():
@@ -367,37 +346,7 @@ async def stream_generate_content(
                 return
 
             # 处理SSE格式的chunk
-            if isinstance(chunk, (str, bytes)):
-                chunk_str = chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
-
-                # 解析并展开 response 包装
-                if chunk_str.startswith("data: "):
-                    json_str = chunk_str[6:].strip()
-
-                    # 跳过 [DONE] 标记
-                    if json_str == "[DONE]":
-                        yield chunk
-                        continue
-
-                    try:
-                        # 解析JSON
-                        data = json.loads(json_str)
-
-                        # 展开 response 包装
-                        if "response" in data and "candidates" not in data:
-                            log.debug(f"[GEMINICLI] 展开response包装")
-                            unwrapped_data = data["response"]
-                            # 重新构建SSE格式
-                            yield f"data: {json.dumps(unwrapped_data, ensure_ascii=False)}\n\n".encode('utf-8')
-                        else:
-                            # 已经是展开的格式，直接返回
-                            yield chunk
-                    except json.JSONDecodeError:
-                        # JSON解析失败，直接返回原始chunk
-                        yield chunk
-                else:
-                    # 不是SSE格式，直接返回
-                    yield chunk
+            yield unwrap_sse_chunk(chunk, "GEMINICLI")
 
     # ========== 根据模式选择生成器 ==========
     if use_fake_streaming:
@@ -421,37 +370,32 @@ async def count_tokens(
     """
 
     try:
-        request_data = await request.json()
+        # 直接解析原始请求体（orjson 可用时更快），不经过 Starlette 的 stdlib json
+        request_data = json_loads(await request.body())
     except Exception as e:
         log.error(f"Failed to parse JSON request: {e}")
         raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
 
     # 简单的token计数模拟 - 基于文本长度估算
-    total_tokens = 0
-
-    # 如果有contents字段
+    # contents 字段优先，其次 generateContentRequest.contents
     if "contents" in request_data:
-        for content in request_data["contents"]:
-            if "parts" in content:
-                for part in content["parts"]:
-                    if "text" in part:
-                        # 简单估算：大约4字符=1token
-                        text_length = len(part["text"])
-                        total_tokens += max(1, text_length // 4)
-
-    # 如果有generateContentRequest字段
+        contents = request_data["contents"]
     elif "generateContentRequest" in request_data:
-        gen_request = request_data["generateContentRequest"]
-        if "contents" in gen_request:
-            for content in gen_request["contents"]:
-                if "parts" in content:
-                    for part in content["parts"]:
-                        if "text" in part:
-                            text_length = len(part["text"])
-                            total_tokens += max(1, text_length // 4)
+        contents = request_data["generateContentRequest"].get("contents", [])
+    else:
+        contents = []
+
+    # 简单估算：每个文本 part 大约4字符=1token（至少1），单个生成器表达式累加
+    total_tokens = sum(
+        max(1, len(part["text"]) // 4)
+        for content in contents
+        if "parts" in content
+        for part in content["parts"]
+        if "text" in part
+    )
 
     # 返回Gemini格式的响应
-    return JSONResponse(content={"totalTokens": total_tokens})
+    return FastJSONResponse(content={"totalTokens": total_tokens})
 
 # ==================== 测试代码 ====================
 
@@ -13,18 +13,17 @@ if str(project_root) not in sys.path:
 
 # 第三方库
 from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
 
 # 本地模块 - 工具和认证
 from src.utils import (
     get_available_models,
     get_base_model_from_feature_model,
-    authenticate_flexible
+    authenticate_flexible,
+    FastJSONResponse,
 )
 
 # 本地模块 - 基础路由工具
 from src.router.base_router import create_gemini_model_list, create_openai_model_list
-from src.models import model_to_dict
 from log import log
 
 
@@ -44,7 +43,7 @@ async def list_gemini_models(token: str = Depends(authenticate_flexible)):
     """
     models = get_available_models("gemini")
     log.info("[GEMINICLI MODEL LIST] 返回 Gemini 格式")
-    return JSONResponse(content=create_gemini_model_list(
+    return FastJSONResponse(content=create_gemini_model_list(
         models,
         base_name_extractor=get_base_model_from_feature_model
     ))
@@ -59,8 +58,4 @@ async def list_openai_models(token: str = Depends(authenticate_flexible)):
     """
     models = get_available_models("gemini")
     log.info("[GEMINICLI MODEL LIST] 返回 OpenAI 格式")
-    model_list = create_openai_model_list(models, owned_by="google")
-    return JSONResponse(content={
-        "object": "list",
-        "data": [model_to_dict(model) for model in model_list.data]
-    })
+    return FastJSONResponse(content=create_openai_model_list(models, owned_by="google"))
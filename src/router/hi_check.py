@@ -6,6 +6,8 @@
 import time
 from typing import Any, Dict, List
 
+from src.utils import json_dumps_bytes
+
 
 # ==================== Hi消息检测 ====================
 
@@ -67,6 +69,25 @@ def is_health_check_message(messages: List[Dict[str, Any]]) -> bool:
     )
 
 
+def is_health_check_model_request(request: Any) -> bool:
+    """
+    直接在已校验的请求模型上检查健康检查消息（ClaudeRequest / OpenAIChatCompletionRequest 通用）
+
+    只读取 messages 的 role / content 属性，不需要先 model_to_dict 整个请求，供路由在转换前快速短路。
+
+    Args:
+        request: 带 messages 属性的 Pydantic 请求模型实例
+
+    Returns:
+        是否为健康检查消息
+    """
+    messages = request.messages
+    if len(messages) != 1:
+        return False
+    message = messages[0]
+    return message.role == "user" and message.content == "Hi"
+
+
 # ==================== Hi消息响应生成 ====================
 
 def create_health_check_response(format: str = "openai", **kwargs) -> dict:
@@ -129,3 +150,30 @@ def create_health_check_response(format: str = "openai", **kwargs) -> dict:
     
     # 未知格式返回空字典
     return {}
+
+
+# Gemini / Anthropic（默认参数）响应内容固定，导入时预先序列化，避免每次 Hi 请求重复编码
+_PRESERIALIZED_RESPONSES: Dict[str, bytes] = {
+    "gemini": json_dumps_bytes(create_health_check_response(format="gemini")),
+    "anthropic": json_dumps_bytes(create_health_check_response(format="anthropic")),
+}
+
+
+def create_health_check_response_bytes(format: str = "openai", **kwargs) -> bytes:
+    """
+    创建已序列化的健康检查响应体（JSON bytes）
+
+    无额外参数时优先返回预序列化的常量；OpenAI 格式包含时间戳，每次重新序列化
+
+    Args:
+        format: 响应格式（"openai"、"gemini" 或 "anthropic"）
+        **kwargs: 同 create_health_check_response
+
+    Returns:
+        JSON 响应体
+    """
+    if not kwargs:
+        cached = _PRESERIALIZED_RESPONSES.get(format)
+        if cached is not None:
+            return cached
+    return json_dumps_bytes(create_health_check_response(format=format, **kwargs))
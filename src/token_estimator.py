@@ -9,22 +9,24 @@ def estimate_input_tokens(payload: Dict[str, Any]) -> int:
     total_chars = 0
     image_count = 0
 
-    # 统计所有文本字符
-    def count_str(obj: Any) -> None:
-        nonlocal total_chars, image_count
-        if isinstance(obj, str):
+    # 统计所有文本字符（显式栈迭代，避免逐节点的递归调用与 nonlocal 开销）
+    # payload 来自 JSON 解析，只含精确的内置类型，用 type() is 判断代替 isinstance 的子类检查
+    stack = [payload]
+    pop = stack.pop
+    push = stack.extend
+    str_type, dict_type, list_type = str, dict, list
+    while stack:
+        obj = pop()
+        obj_type = type(obj)
+        if obj_type is str_type:
             total_chars += len(obj)
-        elif isinstance(obj, dict):
+        elif obj_type is dict_type:
             # 检测图片
             if obj.get("type") == "image" or "inlineData" in obj:
                 image_count += 1
-            for v in obj.values():
-                count_str(v)
-        elif isinstance(obj, list):
-            for item in obj:
-                count_str(item)
-
-    count_str(payload)
+            push(obj.values())
+        elif obj_type is list_type:
+            push(obj)
 
     # 粗略估算：字符数/4 + 每张图片300 tokens
     return max(1, total_chars // 4 + image_count * 300)
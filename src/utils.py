@@ -1,13 +1,15 @@
-from typing import List, Optional
+import hmac
+import itertools
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional
 
 from config import get_api_password, get_panel_password
-from fastapi import Depends, HTTPException, Header, Query, Request, status
-from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from fastapi import HTTPException, Request, status
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
 from log import log
 
-# HTTP Bearer security scheme
-security = HTTPBearer()
-
 # ====================== OAuth Configuration ======================
 
 GEMINICLI_USER_AGENT = "GeminiCLI/0.1.5 (Windows; AMD64)"
@@ -147,18 +149,107 @@ def get_available_models(router_type: str = "openai") -> List[str]:
     return models
 
 
+# ====================== JSON Helpers ======================
+
+# orjson 为可选依赖（部分平台如 termux 难以编译），不可用时回退到标准库 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_dumps_bytes(obj: Any) -> bytes:
+    """紧凑序列化为 UTF-8 bytes（不转义非 ASCII 字符）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # orjson 不支持的类型（如超出 64 位的整数）交给标准库处理
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_dumps(obj: Any) -> str:
+    """紧凑序列化为 str（不转义非 ASCII 字符）"""
+    if orjson is not None:
+        return json_dumps_bytes(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def json_loads(data: Any) -> Any:
+    """解析 JSON（支持 str / bytes），解析失败时抛出 ValueError"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """使用 json_dumps_bytes 序列化的 JSONResponse，orjson 不可用时行为与 JSONResponse 一致"""
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps_bytes(content)
+
+
+class FastJSONRequest(Request):
+    """使用 json_loads 解析请求体的 Request，FastAPI 解析 Pydantic 请求体参数时会调用其 json()"""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = json_loads(await self.body())
+        return self._json
+
+
+class FastJSONRoute(APIRoute):
+    """将请求包装为 FastJSONRequest 的路由类，用法: APIRouter(route_class=FastJSONRoute)"""
+
+    def get_route_handler(self) -> Callable:
+        original_route_handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            return await original_route_handler(FastJSONRequest(request.scope, request.receive))
+
+        return route_handler
+
+
+# ====================== ID Helpers ======================
+
+# 进程级随机前缀 + 单调计数器：消息/工具调用 ID 只需唯一，不需要密码学随机性
+_SEQUENTIAL_ID_PREFIX = os.urandom(8).hex()
+_SEQUENTIAL_ID_COUNTER = itertools.count()
+
+
+def sequential_id() -> str:
+    """生成 32 位十六进制 ID（16 位进程随机前缀 + 16 位递增计数），每次调用无需系统调用"""
+    return f"{_SEQUENTIAL_ID_PREFIX}{next(_SEQUENTIAL_ID_COUNTER):016x}"
+
+
 # ====================== Authentication Functions ======================
 
-async def authenticate_flexible(
-    request: Request,
-    authorization: Optional[str] = Header(None),
-    x_api_key: Optional[str] = Header(None, alias="x-api-key"),
-    access_token: Optional[str] = Header(None, alias="access_token"),
-    x_goog_api_key: Optional[str] = Header(None, alias="x-goog-api-key"),
-    x_anthropic_auth_token: Optional[str] = Header(None, alias="x-anthropic-auth-token"),
-    anthropic_auth_token: Optional[str] = Header(None, alias="anthropic-auth-token"),
-    key: Optional[str] = Query(None)
-) -> str:
+def secret_equals(provided: str, expected: str) -> bool:
+    """常量时间比较密码/令牌，避免逐字符比较带来的时序侧信道"""
+    return hmac.compare_digest(provided.encode("utf-8"), expected.encode("utf-8"))
+
+
+def _snapshot_headers(request: Request) -> Dict[bytes, bytes]:
+    """
+    将 ASGI scope 中的原始请求头一次性转换为字典
+
+    ASGI 规定头名已为小写 bytes；同名头保留第一个值，与 Headers.get 行为一致。
+    相比逐个 Header() 参数各自线性扫描头列表，只需遍历一次。
+    """
+    snapshot: Dict[bytes, bytes] = {}
+    for name, value in request.scope["headers"]:
+        snapshot.setdefault(name, value)
+    return snapshot
+
+
+def _header_value(headers: Dict[bytes, bytes], name: bytes) -> Optional[str]:
+    """从请求头快照中取值并按 latin-1 解码（与 Starlette 一致）"""
+    value = headers.get(name)
+    return value.decode("latin-1") if value is not None else None
+
+
+async def authenticate_flexible(request: Request) -> str:
     """
     统一的灵活认证函数，支持多种认证方式
 
@@ -174,14 +265,7 @@ async def authenticate_flexible(
         - HTTP 头部: anthropic-auth-token
 
     Args:
-        request: FastAPI Request 对象
-        authorization: Authorization 头部值（自动注入）
-        x_api_key: x-api-key 头部值（自动注入）
-        access_token: access_token 头部值（自动注入）
-        x_goog_api_key: x-goog-api-key 头部值（自动注入）
-        x_anthropic_auth_token: x-anthropic-auth-token 头部值（自动注入）
-        anthropic_auth_token: anthropic-auth-token 头部值（自动注入）
-        key: URL 参数 key（自动注入）
+        request: FastAPI Request 对象（请求头与 URL 参数均从中一次性读取）
 
     Returns:
         验证通过的token
@@ -199,6 +283,16 @@ async def authenticate_flexible(
     token = None
     auth_method = None
 
+    headers = _snapshot_headers(request)
+    key = request.query_params.get("key")
+    x_goog_api_key = _header_value(headers, b"x-goog-api-key")
+    x_anthropic_auth_token = _header_value(headers, b"x-anthropic-auth-token")
+    anthropic_auth_token = _header_value(headers, b"anthropic-auth-token")
+    x_api_key = _header_value(headers, b"x-api-key")
+    # FastAPI 的 Header 参数会把下划线转换为连字符，两种写法都接受
+    access_token = _header_value(headers, b"access-token") or _header_value(headers, b"access_token")
+    authorization = _header_value(headers, b"authorization")
+
     # 1. 尝试从 URL 参数 key 获取（Google 官方标准方式）
     if key:
         token = key
@@ -249,7 +343,7 @@ async def authenticate_flexible(
         )
     
     # 验证 token
-    if token != password:
+    if not secret_equals(token, password):
         log.debug(f"Authentication failed using {auth_method}")
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -267,23 +361,27 @@ authenticate_gemini_flexible = authenticate_flexible
 
 # ====================== Panel Authentication Functions ======================
 
-async def verify_panel_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
+async def verify_panel_token(request: Request) -> str:
     """
     简化的控制面板密码验证函数
 
-    直接验证Bearer token是否等于控制面板密码
+    直接从请求头解析 Bearer token 并验证是否等于控制面板密码，
+    不经过 HTTPBearer 依赖（省去额外的依赖协程与凭据对象构造）
 
     Args:
-        credentials: HTTPAuthorizationCredentials 自动注入
+        request: FastAPI Request 对象
 
     Returns:
         验证通过的token
 
     Raises:
-        HTTPException: 密码错误时抛出401异常
+        HTTPException: 缺少 Bearer 凭据时抛出403异常，密码错误时抛出401异常
     """
+    scheme, _, token = (request.headers.get("authorization") or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authenticated")
 
     password = await get_panel_password()
-    if credentials.credentials != password:
+    if not secret_equals(token, password):
         raise HTTPException(status_code=401, detail="密码错误")
-    return credentials.credentials
+    return token
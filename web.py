@@ -15,6 +15,7 @@ from log import log
 
 # Import managers and utilities
 from src.credential_manager import credential_manager
+from src.httpx_client import http_client
 
 # Import all routers
 from src.router.antigravity.openai import router as antigravity_openai_router
@@ -92,6 +93,13 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             log.error(f"关闭凭证管理器时出错: {e}")
 
+    # 最后关闭共享的HTTP连接池
+    try:
+        await http_client.close()
+        log.info("HTTP客户端连接池已关闭")
+    except Exception as e:
+        log.error(f"关闭HTTP客户端时出错: {e}")
+
     log.info("GCLI2API 主服务已停止")
 
 